@@ -21,7 +21,7 @@ except ImportError:
 from .arguments import *
 from . import textui
 from . import utils
-from .pipes import piped_in
+from .pipes import piped_in, piped_lines, piped_chunks, piped_bytes
 
 
 
@@ -12,6 +12,7 @@ This module provides the CLI argument interface.
 from __future__ import absolute_import
 
 import os
+from bisect import bisect_left
 from sys import argv
 
 try:
@@ -19,13 +20,71 @@ try:
 except ImportError:
     from .packages.ordereddict import OrderedDict
 
-from .utils import expand_path, is_collection
+from .textui.validators import ValidationError
+from .utils import basestring, is_collection, iter_files
 
-__all__ = ('Args', )
+__all__ = ('Args', 'Schema', 'Option', 'Positional', 'ParsedArgs',
+           'ArgumentError')
+
+
+class _ArgsIndex(object):
+    """Positions of arguments by value, to look arguments up without
+    scanning all of them."""
+
+    def __init__(self, args):
+        self.positions = {}
+        for i, arg in enumerate(args):
+            self.positions.setdefault(arg, []).append(i)
+        self._sorted = None
+
+    def first(self, value):
+        """Returns the first position of given value, else None."""
+        try:
+            positions = self.positions.get(value)
+        except TypeError:  # unhashable, can't be an argument
+            return None
+        return positions[0] if positions else None
+
+    def with_prefix(self, prefix):
+        """Returns the positions of arguments starting with prefix."""
+        if self._sorted is None:
+            self._sorted = sorted(arg for arg in self.positions
+                                  if isinstance(arg, basestring))
+
+        keys = self._sorted
+        positions = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            positions.extend(self.positions[keys[i]])
+            i += 1
+        return positions
+
+
+def _split_flag(arg):
+    """Splits a flag into (flag, value) pairs: ``--key=value`` gives
+    ('--key', 'value') and combined short flags like ``-abc`` give
+    ('-a', None), ('-b', None), ('-c', None)."""
+    if arg.startswith('--'):
+        if '=' in arg:
+            return [tuple(arg.split('=', 1))]
+    elif len(arg) > 2 and arg[1:].isalpha():
+        return [('-' + c, None) for c in arg[1:]]
+    return [(arg, None)]
+
+
+def _copy(args):
+    """Copies a cached Args view, so callers may change it."""
+    return Args(list(args._args), no_argv=True)
 
 
 class Args(object):
-    """CLI Argument management."""
+    """CLI Argument management.
+
+    Lookups and views such as grouped, flags and files are computed once
+    and cached until remove() or pop() is called, or the argument list
+    changes size. Editing ``all`` in place without changing its size
+    (``args.all[1] = 'z'``) isn't noticed; use remove() and pop().
+    """
 
     def __init__(self, args=None, no_argv=False):
         if not args:
@@ -36,6 +95,79 @@ class Args(object):
         else:
             self._args = args
 
+        self._invalidate()
+
+
+    def _cached(self, name, build):
+        """Returns the value cached under name, building it if needed.
+
+        The cache is dropped by remove() and pop(), and whenever the
+        argument list was replaced or changed size.
+        """
+        state = self._cache_state
+        if state is None or state[0] is not self._args or state[1] != len(self._args):
+            self._cache = {}
+            self._cache_state = (self._args, len(self._args))
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = build()
+            return value
+
+
+    def _invalidate(self):
+        self._cache = {}
+        self._cache_state = None
+
+
+    def _index(self):
+        """Returns the index of the arguments, building it if needed."""
+        return self._cached('index', lambda: _ArgsIndex(self._args))
+
+
+    def _views(self):
+        """Sorts the arguments into the grouped, flags and not_flags views
+        in a single pass."""
+
+        grouped = OrderedDict(_=Args(no_argv=True))
+        flags = []
+        not_flags = []
+
+        group = grouped['_']
+
+        for arg in self._args:
+            if arg.startswith('-'):
+                flags.append(arg)
+                for flag, value in _split_flag(arg):
+                    if flag not in grouped:
+                        grouped[flag] = Args(no_argv=True)
+                    group = grouped[flag]
+                    if value is not None:
+                        group._args.append(value)
+            else:
+                group._args.append(arg)
+
+            if '-' not in arg:
+                not_flags.append(arg)
+
+        return grouped, Args(flags, no_argv=True), Args(not_flags, no_argv=True)
+
+
+    def _paths(self):
+        """Expands the arguments into the files and not_files views in a
+        single pass."""
+
+        files = []
+        not_files = []
+
+        for arg in self._args:
+            paths = list(iter_files(arg))
+            files.extend(paths)
+            if not paths and not os.path.exists(arg):
+                not_files.append(arg)
+
+        return files, Args(not_files, no_argv=True)
+
 
     def __len__(self):
         return len(self._args)
@@ -76,10 +208,11 @@ class Args(object):
             found = self.first(x)
             if found is not None:
                 self._args.pop(found)
+                self._invalidate()
 
         if is_collection(x):
             for item in x:
-                _remove(x)
+                _remove(item)
         else:
             _remove(x)
 
@@ -87,15 +220,17 @@ class Args(object):
     def pop(self, x):
         """Removes and Returns value at given index, else none."""
         try:
-            return self._args.pop(x)
+            value = self._args.pop(x)
         except IndexError:
             return None
+        self._invalidate()
+        return value
 
 
     def any_contain(self, x):
         """Tests if given string is contained in any stored argument."""
 
-        return bool(self.first_with(x))
+        return self.first_with(x) is not None
 
 
     def contains(self, x):
@@ -108,11 +243,10 @@ class Args(object):
     def first(self, x):
         """Returns first found index of given value (or list of values)"""
 
-        def _find( x):
-            try:
-                return self.all.index(str(x))
-            except ValueError:
-                return None
+        index = self._index()
+
+        def _find(x):
+            return index.first(str(x))
 
         if is_collection(x):
             for item in x:
@@ -128,17 +262,15 @@ class Args(object):
         """Returns first found index containing value (or list of values)"""
 
         def _find(x):
-            try:
-                for arg in self.all:
-                    if x in arg:
-                        return self.all.index(arg)
-            except ValueError:
-                return None
+            for i, arg in enumerate(self.all):
+                if x in arg:
+                    return i
+            return None
 
         if is_collection(x):
             for item in x:
                 found = _find(item)
-                if found:
+                if found is not None:
                     return found
             return None
         else:
@@ -149,17 +281,15 @@ class Args(object):
         """Returns first found index not containing value (or list of values)"""
 
         def _find(x):
-            try:
-                for arg in self.all:
-                    if x not in arg:
-                        return self.all.index(arg)
-            except ValueError:
-                return None
+            for i, arg in enumerate(self.all):
+                if x not in arg:
+                    return i
+            return None
 
         if is_collection(x):
             for item in x:
                 found = _find(item)
-                if found:
+                if found is not None:
                     return found
             return None
         else:
@@ -167,21 +297,16 @@ class Args(object):
 
 
     def start_with(self, x):
-           """Returns all arguments beginning with given string (or list thereof)"""
+        """Returns all arguments beginning with given string (or list thereof)"""
 
-           _args = []
+        index = self._index()
+        prefixes = x if is_collection(x) else [x]
 
-           for arg in self.all:
-               if is_collection(x):
-                   for _x in x:
-                       if arg.startswith(x):
-                           _args.append(arg)
-                           break
-               else:
-                   if arg.startswith(x):
-                       _args.append(arg)
+        positions = set()
+        for prefix in prefixes:
+            positions.update(index.with_prefix(prefix))
 
-           return Args(_args, no_argv=True)
+        return Args([self.all[i] for i in sorted(positions)], no_argv=True)
 
 
     def contains_at(self, x, index):
@@ -192,8 +317,7 @@ class Args(object):
                 for _x in x:
                     if (_x in self.all[index]) or (_x == self.all[index]):
                         return True
-                    else:
-                        return False
+                return False
             else:
                 return (x in self.all[index])
 
@@ -216,14 +340,12 @@ class Args(object):
     def value_after(self, x):
         """Returns value of argument after given found argument (or list thereof)."""
 
-        try:
-            try:
-                i = self.all.index(x)
-            except ValueError:
-                return None
+        i = self._index().first(x)
+        if i is None:
+            return None
 
+        try:
             return self.all[i + 1]
-
         except IndexError:
             return None
 
@@ -232,23 +354,13 @@ class Args(object):
     def grouped(self):
         """Extracts --flag groups from argument list.
            Returns {format: Args, ...}
-        """
-
-        collection = OrderedDict(_=Args(no_argv=True))
 
-        _current_group = None
-
-        for arg in self.all:
-            if arg.startswith('-'):
-                _current_group = arg
-                collection.setdefault(arg, Args(no_argv=True))
-            else:
-                if _current_group:
-                    collection[_current_group]._args.append(arg)
-                else:
-                    collection['_']._args.append(arg)
+           ``--key=value`` adds value to the --key group and combined
+           short flags (``-abc``) make a group for each flag.
+        """
 
-        return collection
+        grouped = self._cached('views', self._views)[0]
+        return OrderedDict((flag, _copy(group)) for flag, group in grouped.items())
 
 
     @property
@@ -308,45 +420,42 @@ class Args(object):
     def flags(self):
         """Returns Arg object including only flagged arguments."""
 
-        return self.start_with('-')
+        return _copy(self._cached('views', self._views)[1])
 
 
     @property
     def not_flags(self):
         """Returns Arg object excluding flagged arguments."""
 
-        return self.all_without('-')
+        return _copy(self._cached('views', self._views)[2])
 
 
     @property
-    def files(self, absolute=False):
+    def files(self):
         """Returns an expanded list of all valid paths that were passed in."""
 
-        _paths = []
+        return list(self._cached('paths', self._paths)[0])
 
-        for arg in self.all:
-            for path in expand_path(arg):
-                if os.path.exists(path):
-                    if absolute:
-                        _paths.append(os.path.abspath(path))
-                    else:
-                        _paths.append(path)
 
-        return _paths
+    def iter_files(self, include=None, exclude=None, workers=None):
+        """Yields all valid paths that were passed in, expanded, as they
+        are found.
+
+        include and exclude are glob patterns (or lists thereof) for file
+        names; excluded directories aren't entered. With workers,
+        directories are listed in that many threads.
+        """
+
+        for arg in self._args:
+            for path in iter_files(arg, include, exclude, workers):
+                yield path
 
 
     @property
     def not_files(self):
         """Returns a list of all arguments that aren't files/globs."""
 
-        _args = []
-
-        for arg in self.all:
-            if not len(expand_path(arg)):
-                if not os.path.exists(arg):
-                    _args.append(arg)
-
-        return Args(_args, no_argv=True)
+        return _copy(self._cached('paths', self._paths)[1])
 
     @property
     def copy(self):
@@ -354,3 +463,269 @@ class Args(object):
 
         return Args(self.all)
 
+
+
+class ArgumentError(ValidationError):
+    """Arguments that don't match a Schema."""
+
+    def __str__(self):
+        return self.message
+
+
+def _validate(name, value, validators):
+    """Runs value through validators, like prompt.query does."""
+    try:
+        for validator in validators:
+            value = validator(value)
+    except ValidationError as e:
+        raise ArgumentError('%s: %s' % (name, e.message))
+    except (TypeError, ValueError) as e:  # plain types such as int
+        raise ArgumentError('%s: %s' % (name, e))
+    return value
+
+
+class Option(object):
+    """An option of a Schema, e.g. ``Option('--count', '-n', type=int)``.
+
+    Flags (``flag=True``) are True when given, or counted with
+    ``repeat=True`` (``-vvv``). Other options take a value, converted by
+    type and/or checked by validators (see :mod:`clint.textui.validators`);
+    with ``repeat=True`` every value given is kept in a list.
+    """
+
+    def __init__(self, *names, **kwargs):
+        self.names = names
+        self.flag = kwargs.get('flag', False)
+        self.repeat = kwargs.get('repeat', False)
+        self.required = kwargs.get('required', False)
+
+        self.validators = list(kwargs.get('validators') or ())
+        if kwargs.get('type') is not None:
+            self.validators.insert(0, kwargs['type'])
+
+        long_names = [name for name in names if name.startswith('--')]
+        self.dest = kwargs.get('dest') or (long_names or names)[0].lstrip('-').replace('-', '_')
+
+        if 'default' in kwargs:
+            self.default = kwargs['default']
+        elif self.flag:
+            self.default = 0 if self.repeat else False
+        else:
+            self.default = [] if self.repeat else None
+
+    def __repr__(self):
+        return '<option %s>' % ('/'.join(self.names), )
+
+
+class Positional(object):
+    """Positional arguments of a Schema. nargs is None for exactly one
+    argument, '?' for an optional one, '*' for any number and '+' for at
+    least one."""
+
+    def __init__(self, dest, nargs=None, type=None, validators=None, default=None):
+        if nargs not in (None, '?', '*', '+'):
+            raise ValueError('Unknown nargs: %r' % (nargs, ))
+
+        self.dest = dest
+        self.nargs = nargs
+        self.validators = list(validators or ())
+        if type is not None:
+            self.validators.insert(0, type)
+
+        if default is None and nargs in ('*', '+'):
+            default = []
+        self.default = default
+
+    def __repr__(self):
+        return '<positional %s>' % (self.dest, )
+
+
+class ParsedArgs(object):
+    """Values of the arguments parsed by a Schema, as attributes."""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    def __getitem__(self, name):
+        return self.__dict__[name]
+
+    def __contains__(self, name):
+        return name in self.__dict__
+
+    def __eq__(self, other):
+        return isinstance(other, ParsedArgs) and vars(self) == vars(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<parsed-args %r>' % (vars(self), )
+
+
+class Schema(object):
+    """Declares the options and positional arguments of a command, and
+    parses them in a single pass.
+
+        >>> schema = Schema(
+        ...     Option('--verbose', '-v', flag=True, repeat=True),
+        ...     Option('--count', '-n', type=IntegerValidator(), default=1),
+        ...     Positional('files', nargs='+'),
+        ... )
+        >>> args = schema.parse()  # or parse(Args) / parse(list)
+        >>> args.verbose, args.count, args.files
+
+    Options may be given as ``--count 3``, ``--count=3``, ``-n 3`` or
+    ``-n3``; short flags may be combined (``-vvn3``) and ``--`` ends the
+    options. Arguments that don't match raise ArgumentError.
+    """
+
+    def __init__(self, *specs):
+        self.options = [spec for spec in specs if isinstance(spec, Option)]
+        self.positionals = [spec for spec in specs if isinstance(spec, Positional)]
+
+        if len([p for p in self.positionals if p.nargs in ('*', '+')]) > 1:
+            raise ValueError('Only one positional may take any number of arguments')
+
+        # Compile the option names into a single lookup table
+        self._names = {}
+        for option in self.options:
+            for name in option.names:
+                if name in self._names:
+                    raise ValueError('Option %s declared twice' % (name, ))
+                self._names[name] = option
+
+        dests = set()
+        for spec in self.options + self.positionals:
+            if spec.dest in dests:
+                raise ValueError('Destination %s declared twice' % (spec.dest, ))
+            dests.add(spec.dest)
+
+    def _option(self, name):
+        try:
+            return self._names[name]
+        except KeyError:
+            raise ArgumentError('Unknown option: %s' % (name, ))
+
+    def _is_option(self, arg):
+        """Tests if arg is an option rather than a positional argument,
+        like '-' or a negative number."""
+        if len(arg) < 2 or not arg.startswith('-'):
+            return False
+        if arg in self._names or arg[:2] in self._names:
+            return True
+        try:
+            float(arg)
+        except ValueError:
+            return True
+        return False
+
+    def _set(self, values, option, name, value):
+        if option.flag:
+            values[option.dest] = values[option.dest] + 1 if option.repeat else True
+            return
+
+        value = _validate(name, value, option.validators)
+        if option.repeat:
+            values[option.dest].append(value)
+        else:
+            values[option.dest] = value
+
+    def _assign(self, values, arguments):
+        """Hands out the positional arguments to the declared positionals."""
+
+        required = len([p for p in self.positionals if p.nargs in (None, '+')])
+        spare = len(arguments) - required
+        if spare < 0:
+            missing = [p.dest for p in self.positionals if p.nargs in (None, '+')]
+            raise ArgumentError('Missing arguments: %s' % (', '.join(missing[spare:]), ))
+
+        i = 0
+        for positional in self.positionals:
+            if positional.nargs is None:
+                count = 1
+            elif positional.nargs == '?':
+                count = min(spare, 1)
+                spare -= count
+            else:
+                # greedy, like the '+' and '*' of argparse
+                count = spare + (positional.nargs == '+')
+                spare = 0
+
+            taken = [_validate(positional.dest, arg, positional.validators)
+                     for arg in arguments[i:i + count]]
+            i += count
+
+            if positional.nargs in ('*', '+'):
+                values[positional.dest] = taken
+            elif taken:
+                values[positional.dest] = taken[0]
+
+        if i < len(arguments):
+            raise ArgumentError('Unexpected arguments: %s' % (' '.join(arguments[i:]), ))
+
+    def parse(self, args=None):
+        """Parses given Args (or list of arguments, sys.argv by default)
+        and returns a ParsedArgs."""
+
+        if args is None:
+            args = Args()
+        if isinstance(args, Args):
+            args = args.all
+
+        values = {}
+        for option in self.options:
+            default = option.default
+            values[option.dest] = list(default) if isinstance(default, list) else default
+        for positional in self.positionals:
+            values[positional.dest] = positional.default
+
+        given = set()
+        arguments = []
+
+        args = iter(args)
+        for arg in args:
+            if arg == '--':
+                arguments.extend(args)
+                break
+
+            if not self._is_option(arg):
+                arguments.append(arg)
+                continue
+
+            # Long options, and single dash ones longer than a letter (-name)
+            name, eq, value = arg.partition('=')
+            if arg.startswith('--') or (len(name) > 2 and name in self._names):
+                option = self._option(name)
+                if option.flag:
+                    if eq:
+                        raise ArgumentError('%s takes no value' % (name, ))
+                elif not eq:
+                    value = next(args, None)
+                    if value is None:
+                        raise ArgumentError('%s expects a value' % (name, ))
+                self._set(values, option, name, value)
+                given.add(option)
+                continue
+
+            # Short options: -v, -n3, -n 3 or combined flags like -vvn3
+            for j in range(1, len(arg)):
+                name = '-' + arg[j]
+                option = self._option(name)
+                given.add(option)
+                if option.flag:
+                    self._set(values, option, name, None)
+                    continue
+                value = arg[j + 1:] or next(args, None)
+                if value is None:
+                    raise ArgumentError('%s expects a value' % (name, ))
+                self._set(values, option, name, value)
+                break
+
+        missing = [o.names[0] for o in self.options if o.required and o not in given]
+        if missing:
+            raise ArgumentError('Missing options: %s' % (', '.join(missing), ))
+
+        self._assign(values, arguments)
+        return ParsedArgs(values)
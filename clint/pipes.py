@@ -11,11 +11,22 @@ This module contains the helper functions for dealing with unix pipes.
 from __future__ import absolute_import
 from __future__ import with_statement
 
+from contextlib import closing
+
+import os
+import stat
 import sys
 
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
 
-__all__ = ('piped_in', )
+__all__ = ('piped_in', 'piped_lines', 'piped_chunks', 'piped_bytes')
 
+# Size of the chunks read from stdin by piped_chunks() and piped_bytes()
+PIPE_CHUNK_SIZE = 64 * 1024
 
 
 def piped_in():
@@ -23,6 +34,96 @@ def piped_in():
     with sys.stdin as stdin:
         # TTY is only way to detect if stdin contains data
         if not stdin.isatty():
-            return stdin.read()  
+            return stdin.read()
         else:
             return None
+
+
+def _is_piped(stream):
+    try:
+        return not stream.isatty()
+    except (AttributeError, ValueError):  # no isatty(), or closed
+        return False
+
+
+def piped_lines(keepends=False):
+    """Yields the lines piped via stdin, one at a time. Yields nothing if
+    stdin is a terminal.
+
+        >>> for line in piped_lines():
+        ...     puts(line)
+    """
+    if not _is_piped(sys.stdin):
+        return
+
+    for line in sys.stdin:
+        if not keepends:
+            line = line.rstrip('\r\n')
+        yield line
+
+
+def piped_chunks(size=PIPE_CHUNK_SIZE):
+    """Yields the text piped via stdin in chunks of up to size characters.
+    Yields nothing if stdin is a terminal."""
+    if not _is_piped(sys.stdin):
+        return
+
+    while True:
+        chunk = sys.stdin.read(size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _regular_file_size(stream):
+    """Returns the size of the file behind stream, or None if it isn't a
+    regular file (e.g. a pipe)."""
+    try:
+        st = os.fstat(stream.fileno())
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_size
+
+
+def _open_mmap(fileno, length):
+    mapped = mmap.mmap(fileno, length, access=mmap.ACCESS_READ)
+    # mmap objects are context managers from Python 3.2 on only
+    if not hasattr(mapped, '__exit__'):
+        return closing(mapped)
+    return mapped
+
+
+def _mmap_chunks(stream, size, file_size):
+    start = stream.tell()
+    with _open_mmap(stream.fileno(), file_size) as mapped:
+        for offset in range(start, file_size, size):
+            yield mapped[offset:offset + size]
+    stream.seek(file_size)
+
+
+def piped_bytes(size=PIPE_CHUNK_SIZE, use_mmap=True):
+    """Yields the bytes piped via stdin in chunks of up to size bytes.
+    Yields nothing if stdin is a terminal.
+
+    When stdin is redirected from a regular file (``cmd < file``) and
+    use_mmap is True, the file is memory mapped rather than read.
+    """
+    if not _is_piped(sys.stdin):
+        return
+
+    stream = getattr(sys.stdin, 'buffer', sys.stdin)
+
+    file_size = _regular_file_size(stream) if use_mmap and mmap else None
+    if file_size:
+        for chunk in _mmap_chunks(stream, size, file_size):
+            yield chunk
+        return
+
+    read = getattr(stream, 'read1', stream.read)
+    while True:
+        chunk = read(size)
+        if not chunk:
+            break
+        yield chunk
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+clint.textui._aprogress
+~~~~~~~~~~~~~~~~~~~~~~~
+
+asyncio counterparts of the progress iterators, re-exported by
+:mod:`clint.textui.progress` on Python 3.6+.
+
+All drawing is done by a background renderer thread, so the event loop
+only ever records progress and never waits on the terminal.
+
+"""
+
+import asyncio
+
+from . import progress as _progress
+from .progress import Bar, BAR_EMPTY_CHAR, BAR_FILLED_CHAR, RENDER_INTERVAL
+
+
+class _Dots(object):
+    """Renderer target printing one dot per ``every`` items."""
+
+    def __init__(self, label, every):
+        self.label = label
+        self.every = every
+        self.last_progress = 0
+        self.drawn = None
+
+    def draw(self, progress):
+        if self.drawn is None:
+            _progress.STREAM.write(self.label)
+            self.drawn = 0
+        # dots() prints a dot for items 0, every, 2 * every...
+        dots = ((progress + self.every - 1) // self.every -
+                (self.drawn + self.every - 1) // self.every)
+        self.drawn = progress
+        _progress.STREAM.write(_progress.DOTS_CHAR * dots)
+        _progress.STREAM.flush()
+
+    def finish(self):
+        self.draw(self.last_progress)
+        _progress.STREAM.write('\n')
+        _progress.STREAM.flush()
+
+
+class _Mill(object):
+    """Renderer target drawing a mill, turning once per redraw."""
+
+    def __init__(self, label, expected_size):
+        self.label = label
+        self.expected_size = expected_size
+        self.last_progress = 0
+        self.redraws = 0
+
+    def draw(self, progress, done=False):
+        chars = _progress.MILL_CHARS
+        char = ' ' if done else chars[self.redraws % len(chars)]
+        self.redraws += 1
+        if self.expected_size is None:
+            line = _progress.MILL_INDETERMINATE_TEMPLATE % (
+                self.label, char, progress)
+        else:
+            line = _progress.MILL_TEMPLATE % (
+                self.label, char, progress, self.expected_size)
+        _progress.STREAM.write(line)
+        _progress.STREAM.flush()
+
+    def finish(self):
+        if self.expected_size is None:
+            self.expected_size = self.last_progress
+        self.draw(self.last_progress, done=True)
+        _progress.STREAM.write('\n')
+        _progress.STREAM.flush()
+
+
+async def _finish(func, *args):
+    """Runs the final (blocking) drawing off the event loop."""
+    await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+
+def _running_loop():
+    """Returns the running event loop, or None outside of one."""
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:  # Python 3.6
+        return asyncio._get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _start(target, interval):
+    renderer = _progress._Renderer(target, interval)
+    renderer.start()
+    return renderer
+
+
+async def abar(ait, label='', width=32, hide=None, empty_char=BAR_EMPTY_CHAR,
+               filled_char=BAR_FILLED_CHAR, expected_size=None,
+               max_refresh=None, estimator=None, unit=None):
+    """Async progress iterator. Wrap your async iterables with it.
+
+        >>> async for row in progress.abar(fetch_rows(), expected_size=n):
+        ...     handle(row)
+    """
+
+    count = _progress._length(ait) if expected_size is None else expected_size
+
+    bar = Bar(label=label, width=width, hide=hide, empty_char=empty_char,
+              filled_char=filled_char, expected_size=count,
+              max_refresh=max_refresh, threaded=True, estimator=estimator,
+              unit=unit)
+    try:
+        i = 0
+        async for item in ait:
+            yield item
+            i += 1
+            bar.show(i)
+    finally:
+        await _finish(bar.done)
+
+
+async def adots(ait, label='', hide=None, every=1, interval=RENDER_INTERVAL):
+    """Async progress iterator. Prints a dot for each ``every`` items."""
+
+    dots = _Dots(label, every)
+    renderer = None if hide else _start(dots, interval)
+    try:
+        async for item in ait:
+            dots.last_progress += 1
+            yield item
+    finally:
+        if renderer is not None:
+            await _finish(renderer.stop)
+            await _finish(dots.finish)
+
+
+async def amill(ait, label='', hide=None, expected_size=None,
+                interval=RENDER_INTERVAL):
+    """Async progress iterator. Prints a mill while iterating."""
+
+    count = _progress._length(ait) if expected_size is None else expected_size
+
+    mill = _Mill(label, count)
+    renderer = None if hide else _start(mill, interval)
+    try:
+        async for item in ait:
+            yield item
+            mill.last_progress += 1
+    finally:
+        if renderer is not None:
+            await _finish(renderer.stop)
+            await _finish(mill.finish)
+
+
+def as_completed(fs, label='', width=32, hide=None, max_refresh=None,
+                 estimator=None, **kwargs):
+    """Like :func:`asyncio.as_completed`, showing a bar of the finished
+    futures. Extra keyword arguments are passed to asyncio.
+
+        >>> for f in progress.as_completed(tasks, label='fetching '):
+        ...     result = await f
+    """
+
+    fs = set(fs)
+    bar = Bar(label=label, width=width, hide=hide, expected_size=len(fs),
+              max_refresh=max_refresh, threaded=True, estimator=estimator)
+    finished = [0]
+    closed = [False]
+
+    def _close():
+        if not closed[0]:
+            closed[0] = True
+            bar.done()
+
+    async def _track(f):
+        try:
+            return await f
+        finally:
+            finished[0] += 1
+            if not closed[0]:
+                bar.show(finished[0])
+                if finished[0] == len(fs):
+                    await _finish(_close)
+
+    # Also finish the bar when the caller stops early (break or error).
+    # This runs on the loop, so hand the drawing to the executor unawaited.
+    try:
+        for f in asyncio.as_completed(fs, **kwargs):
+            yield _track(f)
+    finally:
+        loop = _running_loop()
+        if loop is None:
+            _close()
+        else:
+            loop.run_in_executor(None, _close)
@@ -14,19 +14,44 @@ from __future__ import absolute_import
 import os
 import re
 import sys
+import unicodedata
+import weakref
 
 PY3 = sys.version_info[0] >= 3
 
 from ..packages import colorama
-from ..utils import basestring
+from ..utils import basestring, lru_cache
 
 __all__ = (
     'red', 'green', 'yellow', 'blue',
     'black', 'magenta', 'cyan', 'white',
-    'clean', 'disable'
+    'StyledText', 'clean', 'display_width', 'disable'
 )
 
-COLORS = __all__[:-2]
+COLORS = __all__[:-4]
+
+ESC = '\x1b'
+
+# ECMA-48 escape sequences: CSI (ESC [ params intermediates final), OSC
+# (ESC ] ... BEL or ST), DCS/SOS/PM/APC strings (ESC P|X|^|_ ... ST) and
+# the remaining two-character and nF escapes (e.g. ESC ( B).
+ANSI_RE = re.compile(
+    r'\x1b(?:'
+    r'\[[0-?]*[ -/]*[@-~]'
+    r'|\][^\x07\x1b]*(?:\x07|\x1b\\)'
+    r'|[PX^_][^\x1b]*\x1b\\'
+    r'|[ -/]*[0-~]'
+    r')'
+)
+
+WORD_RE = re.compile(r'\S+')
+NEWLINE_RE = re.compile(r'\r\n|\r|\n')
+
+# Strings made of printable ASCII only are as wide as they are long.
+NON_ASCII_RE = re.compile(r'[^ -~]')
+
+# How many distinct strings display_width() remembers the width of.
+DISPLAY_WIDTH_CACHE_SIZE = 4096
 
 if 'get_ipython' in dir():
     """
@@ -38,9 +63,48 @@ if 'get_ipython' in dir():
 else:
     DISABLE_COLOR = False
 
+# Whether a stream is a terminal, by stream; isatty() is a system call.
+# Weak keys, so that streams (e.g. redirected stdout) can be collected.
+_STREAM_COLOR = weakref.WeakKeyDictionary()
+
+
+def _stream_supports_color(stream):
+    """Tests (once per stream) if given stream is a terminal."""
+    try:
+        return _STREAM_COLOR[stream]
+    except (KeyError, TypeError):  # TypeError: not weak referenceable
+        pass
+
+    try:
+        supported = stream.isatty()
+    except AttributeError:  # output does not support isatty()
+        supported = False
+
+    try:
+        _STREAM_COLOR[stream] = supported
+    except TypeError:
+        pass
+    return supported
+
+
+def _color_enabled(always_color=False):
+    """Tests if colors should be rendered for stdout."""
+    if always_color:
+        return True
+    return not DISABLE_COLOR and _stream_supports_color(sys.stdout)
+
+
+def _escape(color, bold, s):
+    """Wraps given string in the escape sequences for given style."""
+    style = 'BRIGHT' if bold else 'NORMAL'
+    return '%s%s%s%s%s' % (getattr(colorama.Fore, color), getattr(colorama.Style, style), s, colorama.Fore.RESET, getattr(colorama.Style, 'NORMAL'))
+
 
 class ColoredString(object):
     """Enhanced string for __len__ operations on Colored output."""
+
+    __slots__ = ('s', 'color', 'always_color', 'bold', '_rendered')
+
     def __init__(self, color, s, always_color=False, bold=False):
         super(ColoredString, self).__init__()
         if not PY3 and isinstance(s, unicode):
@@ -50,9 +114,16 @@ class ColoredString(object):
         self.color = color
         self.always_color = always_color
         self.bold = bold
+        self._rendered = None
         if os.environ.get('CLINT_FORCE_COLOR'):
             self.always_color = True
 
+    def __setattr__(self, name, value):
+        # Restyling or changing the text invalidates the rendered string
+        if name in ('s', 'color', 'bold'):
+            object.__setattr__(self, '_rendered', None)
+        object.__setattr__(self, name, value)
+
     def __getattr__(self, att):
         def func_help(*args, **kwargs):
             result = getattr(self.s, att)(*args, **kwargs)
@@ -68,21 +139,21 @@ class ColoredString(object):
                 return result
         return func_help
 
+    def _colored(self):
+        """Returns the escape-wrapped string, rendering it only once."""
+        if self._rendered is None:
+            self._rendered = _escape(self.color, self.bold, self.s)
+        return self._rendered
+
     @property
     def color_str(self):
-        style = 'BRIGHT' if self.bold else 'NORMAL'
-        c = '%s%s%s%s%s' % (getattr(colorama.Fore, self.color), getattr(colorama.Style, style), self.s, colorama.Fore.RESET, getattr(colorama.Style, 'NORMAL'))
-
-        if self.always_color:
-            return c
-        elif sys.stdout.isatty() and not DISABLE_COLOR:
-            return c
+        if _color_enabled(self.always_color):
+            return self._colored()
         else:
             return self.s
 
-
     def __len__(self):
-        return len(self.s)
+        return display_width(self.s)
 
     def __repr__(self):
         return "<%s-string: '%s'>" % (self.color, self.s)
@@ -103,6 +174,8 @@ class ColoredString(object):
         return iter(self.color_str)
 
     def __add__(self, other):
+        if isinstance(other, StyledText):
+            return StyledText(self, other)
         return str(self.color_str) + str(other)
 
     def __radd__(self, other):
@@ -115,14 +188,185 @@ class ColoredString(object):
         return ColoredString(self.color, s)
 
 
+class StyledText(object):
+    """Text made of differently styled spans.
+
+    Adding, slicing and splitting StyledText keeps the style of every
+    part; escape sequences are only rendered when it is converted to a
+    string. ``len()`` returns the visible width.
+
+        >>> line = StyledText(red('error'), ': ', green(name, bold=True))
+    """
+
+    __slots__ = ('spans', )
+
+    def __init__(self, *parts):
+        # list of (style, text); style is None for plain text, else a
+        # (color, bold, always_color) tuple
+        self.spans = []
+        for part in parts:
+            self._append(part)
+
+    def _append_span(self, style, text):
+        if not text:
+            return
+        if self.spans and self.spans[-1][0] == style:
+            self.spans[-1] = (style, self.spans[-1][1] + text)
+        else:
+            self.spans.append((style, text))
+
+    def _append(self, part):
+        if isinstance(part, StyledText):
+            for style, text in part.spans:
+                self._append_span(style, text)
+        elif isinstance(part, ColoredString):
+            self._append_span((part.color, part.bold, part.always_color), part.s)
+        else:
+            self._append_span(None, part)
+
+    @property
+    def plain(self):
+        """The text without any styling."""
+        return ''.join(text for style, text in self.spans)
+
+    def render(self):
+        """Returns the text with escape sequences for its styles."""
+        _out = []
+        for style, text in self.spans:
+            if style is not None and _color_enabled(style[2]):
+                text = _escape(style[0], style[1], text)
+            _out.append(text)
+        return ''.join(_out)
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return '<styled-text: %r>' % (self.spans, )
+
+    def __len__(self):
+        return display_width(self.plain)
+
+    def __eq__(self, other):
+        return isinstance(other, StyledText) and self.spans == other.spans
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return StyledText(self, other)
+
+    def __radd__(self, other):
+        return StyledText(other, self)
+
+    def __getitem__(self, key):
+        """Slices the text by character position, keeping styles."""
+        size = len(self.plain)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(size)
+            if step != 1:
+                raise ValueError('StyledText slices do not support steps')
+        else:
+            start = key + size if key < 0 else key
+            if not 0 <= start < size:
+                raise IndexError('StyledText index out of range')
+            stop = start + 1
+
+        result = StyledText()
+        pos = 0
+        for style, text in self.spans:
+            if pos >= stop:
+                break
+            end = pos + len(text)
+            if end > start:
+                result._append_span(style, text[max(start - pos, 0):stop - pos])
+            pos = end
+        return result
+
+    def split(self, sep=None):
+        """Splits like str.split, returning a list of StyledText."""
+        plain = self.plain
+        if sep is None:
+            return [self[m.start():m.end()] for m in WORD_RE.finditer(plain)]
+
+        pieces = []
+        pos = 0
+        for piece in plain.split(sep):
+            pieces.append(self[pos:pos + len(piece)])
+            pos += len(piece) + len(sep)
+        return pieces
+
+    def splitlines(self):
+        """Splits at line boundaries. Unlike str.splitlines, a trailing
+        newline results in a trailing empty line."""
+        plain = self.plain
+        pieces = []
+        pos = 0
+        for m in NEWLINE_RE.finditer(plain):
+            pieces.append(self[pos:m.start()])
+            pos = m.end()
+        pieces.append(self[pos:])
+        return pieces
+
+    def join(self, parts):
+        """Concatenates given parts with this text in between."""
+        result = StyledText()
+        for i, part in enumerate(parts):
+            if i:
+                result._append(self)
+            result._append(part)
+        return result
+
+    def ljust(self, width, fillchar=' '):
+        """Pads the text with fillchar up to given visible width."""
+        return StyledText(self, fillchar * max(width - len(self), 0))
+
+
 def clean(s):
-    strip = re.compile("([^-_a-zA-Z0-9!@#%&=,/'\";:~`\$\^\*\(\)\+\[\]\.\{\}\|\?\<\>\\]+|[^\s]+)")
-    txt = strip.sub('', str(s))
+    """Strips ANSI escape sequences from given string."""
+    # str() would encode unicode text on Python 2
+    txt = s if isinstance(s, basestring) else str(s)
+
+    # Plain strings don't need to go through the regex at all.
+    if ESC not in txt:
+        return txt
+
+    return ANSI_RE.sub('', txt)
 
-    strip = re.compile(r'\[\d+m')
-    txt = strip.sub('', txt)
 
-    return txt
+def _char_width(c):
+    """Returns the number of terminal cells given character occupies.
+    Control characters (e.g. tabs) count as one, as they did with len()."""
+    if unicodedata.combining(c) or unicodedata.category(c) in ('Mn', 'Me', 'Cf'):
+        return 0
+    if unicodedata.east_asian_width(c) in ('W', 'F'):
+        return 2
+    return 1
+
+
+@lru_cache(maxsize=DISPLAY_WIDTH_CACHE_SIZE)
+def _display_width(s):
+    if not NON_ASCII_RE.search(s):
+        return len(s)
+    if isinstance(s, bytes):
+        s = s.decode('utf-8', 'replace')
+    return sum(_char_width(c) for c in s)
+
+
+def display_width(s):
+    """Returns the number of terminal columns given string occupies.
+
+    Escape sequences take no space, East Asian wide characters take two
+    columns and combining or zero-width characters none. Results are
+    cached, so measuring the same string again is cheap.
+    """
+    if isinstance(s, ColoredString):
+        s = s.s
+    elif isinstance(s, StyledText):
+        s = s.plain
+    return _display_width(clean(s))
 
 
 def black(string, always=False, bold=False):
@@ -154,3 +398,4 @@ def disable():
     global DISABLE_COLOR
 
     DISABLE_COLOR = True
+    _STREAM_COLOR.clear()
@@ -10,31 +10,48 @@ Core TextUI functionality for column formatting.
 
 from __future__ import absolute_import
 
-from .formatters import max_width, min_width
-from ..utils import tsplit
+from itertools import chain, islice
 
+from .colored import ColoredString, StyledText, display_width
+from .formatters import max_width, _split_lines
+from ..utils import basestring
+
+import os
+import shutil
+import signal
 import sys
+import time
 
 
 NEWLINES = ('\n', '\r', '\r\n')
 
+# How many leading rows table() measures to determine column widths
+TABLE_SAMPLE = 100
 
+# Alignments of text within a column
+ALIGNMENTS = ('left', 'right', 'center')
 
-def _find_unix_console_width():
-    import termios, fcntl, struct, sys
+DEFAULT_TERMINAL_SIZE = (80, 24)
+# Seconds to trust the cached size for where resizes can't be detected
+# (no SIGWINCH, or SIGWINCH handler not installable outside main thread)
+TERMINAL_SIZE_TTL = 1
+
+# (width, height, expiry time or None) cached by terminal_size()
+_TERMINAL_SIZE = None
+# Our SIGWINCH handler, once installed
+_SIGWINCH_HANDLER = None
 
-    # fcntl.ioctl will fail if stdout is not a tty
-    if not sys.stdout.isatty():
-        return None
+
+def _find_unix_terminal_size(fd):
+    import termios, fcntl, struct
 
     s = struct.pack("HHHH", 0, 0, 0, 0)
-    fd_stdout = sys.stdout.fileno()
-    size = fcntl.ioctl(fd_stdout, termios.TIOCGWINSZ, s)
+    size = fcntl.ioctl(fd, termios.TIOCGWINSZ, s)
     height, width = struct.unpack("HHHH", size)[:2]
-    return width
+    return width, height
 
 
-def _find_windows_console_width():
+def _find_windows_terminal_size():
     # http://code.activestate.com/recipes/440694/
     from ctypes import windll, create_string_buffer
     STDIN, STDOUT, STDERR = -10, -11, -12
@@ -50,92 +67,328 @@ def _find_windows_console_width():
          maxx, maxy) = struct.unpack("hhhhHhhhhhh", csbi.raw)
         sizex = right - left + 1
         sizey = bottom - top + 1
-        return sizex
+        return sizex, sizey
+
+
+def _query_terminal_size():
+    """Asks the terminal for its size through stdout, or through stderr
+    and stdin when stdout is redirected. Returns None if none of them is
+    a terminal."""
+    for stream in (sys.stdout, sys.stderr, sys.stdin):
+        try:
+            fd = stream.fileno()
+        except (AttributeError, IOError, OSError, ValueError):
+            continue
+        try:
+            try:
+                width, height = os.get_terminal_size(fd)
+            except AttributeError:  # Python < 3.3
+                if sys.platform.startswith('win'):
+                    return _find_windows_terminal_size()
+                width, height = _find_unix_terminal_size(fd)
+        except (IOError, OSError, ImportError):
+            continue
+        if width > 0 and height > 0:
+            return width, height
+    return None
+
+
+def _fallback_terminal_size():
+    try:
+        return tuple(shutil.get_terminal_size(DEFAULT_TERMINAL_SIZE))
+    except AttributeError:  # Python < 3.3
+        return DEFAULT_TERMINAL_SIZE
+
+
+def _on_sigwinch(signum, frame, previous=None):
+    global _TERMINAL_SIZE
+    _TERMINAL_SIZE = None
+    if callable(previous):
+        previous(signum, frame)
+
+
+def _sigwinch_installed():
+    """Tests if our SIGWINCH handler is (still) the one in place."""
+    try:
+        return (_SIGWINCH_HANDLER is not None and
+                signal.getsignal(signal.SIGWINCH) is _SIGWINCH_HANDLER)
+    except (AttributeError, ValueError):
+        return False
+
+
+def _install_sigwinch():
+    """Resets the cached terminal size whenever the terminal is resized.
+    Returns False if that is not possible (no SIGWINCH, not called from
+    the main thread, or the application replaced our handler)."""
+    global _SIGWINCH_HANDLER
+    if _SIGWINCH_HANDLER is None:
+        try:
+            previous = signal.getsignal(signal.SIGWINCH)
+            handler = lambda signum, frame: _on_sigwinch(signum, frame, previous)
+            signal.signal(signal.SIGWINCH, handler)
+        except (AttributeError, ValueError):
+            return False
+        _SIGWINCH_HANDLER = handler
+        # Resizes must not interrupt blocking reads (EINTR) on Python < 3.5
+        try:
+            signal.siginterrupt(signal.SIGWINCH, False)
+        except (AttributeError, ValueError):
+            pass
+    return _sigwinch_installed()
+
+
+def _env_size(name):
+    try:
+        size = int(os.environ.get(name, 0))
+    except ValueError:
+        return None
+    return size if size > 0 else None
 
 
-def console_width(kwargs):
-    """"Determine console_width."""
+def terminal_size():
+    """Returns the terminal size as (width, height).
 
-    if sys.platform.startswith('win'):
-        console_width = _find_windows_console_width()
-    else:
-        console_width = _find_unix_console_width()
+    The COLUMNS and LINES environment variables take precedence. Otherwise
+    the terminal behind stdout, stderr or stdin is asked, falling back to
+    shutil.get_terminal_size() and then 80x24. The answer is cached until
+    the terminal is resized (SIGWINCH); where that can't be detected it is
+    cached for TERMINAL_SIZE_TTL seconds.
+    """
+    global _TERMINAL_SIZE
 
-    _width = kwargs.get('width', None)
-    if _width:
-        console_width = _width
-    else:
-        if not console_width:
-            console_width = 80
+    cached = _TERMINAL_SIZE
+    if (cached is None or
+            (cached[2] is None and not _sigwinch_installed()) or
+            (cached[2] is not None and cached[2] < time.time())):
+        width, height = _query_terminal_size() or _fallback_terminal_size()
+        expires = None if _install_sigwinch() else time.time() + TERMINAL_SIZE_TTL
+        cached = _TERMINAL_SIZE = (width, height, expires)
 
-    return console_width
+    return (_env_size('COLUMNS') or cached[0]), (_env_size('LINES') or cached[1])
 
 
+def cached_console_width():
+    """Returns the console width, see :func:`terminal_size`."""
+    return terminal_size()[0]
 
-def columns(*cols, **kwargs):
 
-    columns = list(cols)
+def console_width(kwargs):
+    """"Determine console_width."""
 
-    cwidth = console_width(kwargs)
+    _width = kwargs.get('width', None)
+    if _width:
+        return _width
+
+    return terminal_size()[0]
+
+
+
+def _cell(cell):
+    if isinstance(cell, (basestring, ColoredString, StyledText)):
+        return cell
+    return str(cell)
+
+
+def _cell_width(cell):
+    """Returns the width of the widest line of given cell."""
+    return max(display_width(line) for line in _split_lines(cell))
+
+
+def _fit_widths(widths, available):
+    """Shrinks the widest columns until all of them fit in available."""
+    if sum(widths) <= available:
+        return widths
+
+    # Find the largest cap for which the capped columns fit
+    remaining = available
+    cap = 1
+    ordered = sorted(widths)
+    for i, width in enumerate(ordered):
+        share = remaining // (len(ordered) - i)
+        if width > share:
+            cap = max(share, 1)
+            break
+        remaining -= width
+    return [min(width, cap) for width in widths]
+
+
+def _share_widths(flexible, available):
+    """Splits available columns between flexible columns, given as
+    (weight, min, max) tuples, in proportion to their weights.
+
+    Columns whose share falls outside of their bounds are clamped and the
+    rest is shared again between the others.
+    """
+    widths = [None] * len(flexible)
+    pending = list(range(len(flexible)))
+
+    while pending:
+        total = float(sum(flexible[i][0] for i in pending))
+        clamped = []
+        for i in pending:
+            weight, lower, upper = flexible[i]
+            share = available * weight / total
+            if upper is not None and share > upper:
+                clamped.append((i, upper))
+            elif lower is not None and share < lower:
+                clamped.append((i, lower))
+        if not clamped:
+            break
+        for i, width in clamped:
+            widths[i] = width
+            available -= width
+            pending.remove(i)
+
+    # Hand out the rounded down shares, then the leftovers one by one
+    if pending:
+        total = float(sum(flexible[i][0] for i in pending))
+        shares = dict((i, available * flexible[i][0] / total) for i in pending)
+        for i in pending:
+            widths[i] = int(shares[i])
+        leftover = available - sum(widths[i] for i in pending)
+        for i in sorted(pending, key=lambda i: widths[i] - shares[i])[:max(leftover, 0)]:
+            widths[i] += 1
+
+    return [max(width, 1) for width in widths]
+
+
+def _pad(line, width, align='left'):
+    """Renders line, padded with spaces to given width."""
+    fill = width - display_width(line)
+    text = str(line)
+    if fill <= 0:
+        return text
+    if align == 'right':
+        return ' ' * fill + text
+    if align == 'center':
+        return ' ' * (fill // 2) + text + ' ' * (fill - fill // 2)
+    return text + ' ' * fill
+
+
+def _layout(cells, widths, aligns, separator=' ', end=''):
+    """Yields the lines of a row of cells, each one wrapped to the width
+    of its column."""
+    stack = [max_width(cell, width).split('\n')
+             for cell, width in zip(cells, widths)]
+    height = max(len(lines) for lines in stack)
 
-    _big_col = None
-    _total_cols = 0
+    for i in range(height):
+        yield separator.join(
+            _pad(lines[i] if i < len(lines) else '', width, align)
+            for lines, width, align in zip(stack, widths, aligns)
+        ) + end
 
 
-    for i, (string, width) in enumerate(cols):
+def columns(*cols, **kwargs):
+    """Lays out strings side by side, wrapping each one to its column.
 
-        if width is not None:
-            _total_cols += (width + 1)
-            cols[i][0] = max_width(string, width).split('\n')
-        else:
-            _big_col = i
+        >>> puts(columns([name, 20], [description, None]))
 
-    if _big_col:
-        cols[_big_col][1] = (cwidth - _total_cols) - len(cols)
-        cols[_big_col][0] = max_width(cols[_big_col][0], cols[_big_col][1]).split('\n')
+    Each column is given as ``[string, width]``. Columns with a width of
+    None share the room left on the console (or ``width``). An optional
+    third item holds options for the column:
 
-    height = len(max([c[0] for c in cols], key=len))
-    
-    for i, (strings, width) in enumerate(cols):
+    - ``align``: 'left' (the default), 'right' or 'center'
+    - ``weight``: share of the room a flexible column gets (default 1)
+    - ``min`` / ``max``: bounds on the width of a flexible column
+    """
 
-        for _ in range(height - len(strings)):
-            cols[i][0].append('')
+    cwidth = console_width(kwargs)
 
-        for j, string in enumerate(strings):
-            cols[i][0][j] = min_width(string, width)
+    cells, widths, aligns = [], [], []
+    flexible = []
 
-    stack =  [c[0] for c in cols]
-    _out = []
+    for col in cols:
+        string, width = col[0], col[1]
+        options = col[2] if len(col) > 2 else {}
 
-    for i in range(height):
-        _row = ''
+        align = options.get('align', 'left')
+        if align not in ALIGNMENTS:
+            raise ValueError('Unknown alignment: %r' % (align, ))
 
-        for col in stack:
-            _row += col[i]
-            _row += ' '
+        cells.append(_cell(string))
+        widths.append(width)
+        aligns.append(align)
 
-        _out.append(_row)
-#            try:
-#                pass
-#            except:
-#                pass
+        if width is None:
+            flexible.append((options.get('weight', 1),
+                             options.get('min'), options.get('max')))
 
+    if flexible:
+        fixed = [width for width in widths if width is not None]
+        available = cwidth - sum(fixed) - len(fixed) - len(cols)
+        shares = iter(_share_widths(flexible, available))
+        widths = [next(shares) if width is None else width for width in widths]
 
+    return '\n'.join(_layout(cells, widths, aligns, end=' '))
 
 
-    return '\n'.join(_out)
+def table(rows, sample=TABLE_SAMPLE, widths=None, width=None, separator=' ',
+          colors=None, aligns=None):
+    """Renders an iterable of rows (sequences of cells) as a table,
+    yielding its lines one at a time.
 
+        >>> for line in table(rows):
+        ...     puts(line)
 
-#        string = max_width(string, width)
-#        string = min_width(string, width)
-#        pass
-#        columns.append()
+    Column widths are those of the widest cells among the first ``sample``
+    rows, or among all rows if ``sample`` is None (which needs a first
+    pass over them). Columns are shrunk to fit ``width`` (the console
+    width by default) and cells wider than their column are wrapped.
+    Rendered lines are never kept, so arbitrarily long tables can be
+    streamed.
 
+    Per column, ``widths`` fixes the width (None leaves it measured),
+    ``colors`` holds a function like :func:`colored.red` (or None) applied
+    to the cells which aren't colored yet, and ``aligns`` an alignment
+    (see :func:`columns`).
+    """
 
+    if sample is not None and sample < 1:
+        raise ValueError('sample must be None or at least 1: %r' % (sample, ))
 
-###########################
+    def _cells(row):
+        cells = [_cell(cell) for cell in row]
+        if colors:
+            for i, color in enumerate(colors[:len(cells)]):
+                # cells which already are colored keep their colors
+                if color is not None and isinstance(cells[i], basestring):
+                    cells[i] = color(cells[i])
+        return cells
 
-a = 'this is text that goes into a small column\n cool?'
-b = 'this is other text\nothertext\nothertext'
+    rows = (_cells(row) for row in rows)
 
-#columns((a, 10), (b, 20), (b, None))
+    if sample is None:
+        head = list(rows)
+        rows = iter(())
+    else:
+        head = list(islice(rows, sample))
+
+    if not head:
+        return
+
+    n_cols = max(len(cells) for cells in head)
+    natural = [0] * n_cols
+    for cells in head:
+        for i, cell in enumerate(cells):
+            natural[i] = max(natural[i], _cell_width(cell))
+
+    if widths is not None:
+        for i, fixed in enumerate(widths[:n_cols]):
+            if fixed is not None:
+                natural[i] = fixed
+
+    if width is None:
+        width = console_width({})
+    _widths = _fit_widths(natural, width - len(separator) * (n_cols - 1))
+
+    aligns = list(aligns or ())
+    aligns.extend(['left'] * (n_cols - len(aligns)))
+
+    for cells in chain(head, rows):
+        cells.extend([''] * (n_cols - len(cells)))
+        # cells beyond the measured columns are as wide as they need
+        extra = cells[n_cols:]
+        for line in _layout(cells, _widths + [_cell_width(c) for c in extra],
+                            aligns + ['left'] * len(extra), separator):
+            yield line
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+clint.textui.context
+~~~~~~~~~~~~~~~~~~~~
+
+Per-thread and per-task output state for Puts/Indent/Max Width.
+
+"""
+
+from __future__ import absolute_import
+
+import threading
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+
+__all__ = ('IndentStack', 'OutputContext', 'get_context', 'set_context')
+
+
+class IndentStack(object):
+    """Stack of indent strings that keeps the joined prefix for every
+    depth, so the current prefix is available without re-joining."""
+
+    def __init__(self, strings=()):
+        self._strings = []
+        self._prefixes = ['']
+        for s in strings:
+            self.push(s)
+
+    def push(self, s):
+        """Pushes given indent string onto the stack."""
+        self._strings.append(s)
+        self._prefixes.append(self._prefixes[-1] + s)
+
+    append = push
+
+    def pop(self):
+        """Removes and returns the innermost indent string."""
+        s = self._strings.pop()
+        self._prefixes.pop()
+        return s
+
+    def copy(self):
+        """Returns an independent copy of the stack."""
+        stack = IndentStack()
+        stack._strings = self._strings[:]
+        stack._prefixes = self._prefixes[:]
+        return stack
+
+    @property
+    def prefix(self):
+        """The current indent prefix, all indent strings joined."""
+        return self._prefixes[-1]
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __iter__(self):
+        return iter(self._strings)
+
+    def __getitem__(self, i):
+        return self._strings[i]
+
+    def __repr__(self):
+        return '<IndentStack %r>' % (self._strings, )
+
+
+class OutputContext(object):
+    """Snapshot of the output state: indentation, max width stack and
+    output buffer.
+
+    Contexts are never modified once they are current; changes are made
+    on a copy which is then made current with :func:`set_context`. A
+    thread or task that inherited a context can therefore change its
+    own state without affecting anybody else's.
+    """
+
+    __slots__ = ('indent', 'max_widths', 'buffer')
+
+    def __init__(self, indent=None, max_widths=(), buffer=None):
+        self.indent = IndentStack() if indent is None else indent
+        self.max_widths = max_widths
+        self.buffer = buffer
+
+    def replace(self, **kwargs):
+        """Returns a copy of the context with given attributes replaced."""
+        ctx = OutputContext(self.indent, self.max_widths, self.buffer)
+        for key, value in kwargs.items():
+            setattr(ctx, key, value)
+        return ctx
+
+    def push_indent(self, s):
+        """Returns a copy of the context with given indent string pushed."""
+        indent = self.indent.copy()
+        indent.push(s)
+        return self.replace(indent=indent)
+
+    def pop_indent(self):
+        """Returns a copy of the context with the innermost indent string
+        removed."""
+        indent = self.indent.copy()
+        indent.pop()
+        return self.replace(indent=indent)
+
+    def __repr__(self):
+        return '<OutputContext indent=%r max_widths=%r>' % (
+            self.indent, self.max_widths)
+
+
+_EMPTY = OutputContext()
+
+if contextvars is not None:
+    _CONTEXT = contextvars.ContextVar('clint_output_context', default=_EMPTY)
+
+    def get_context():
+        """Returns the output context of the current thread or task."""
+        return _CONTEXT.get()
+
+    def set_context(ctx):
+        """Makes given output context current for this thread or task."""
+        _CONTEXT.set(ctx)
+
+else:
+    _LOCAL = threading.local()
+
+    def get_context():
+        """Returns the output context of the current thread."""
+        return getattr(_LOCAL, 'ctx', _EMPTY)
+
+    def set_context(ctx):
+        """Makes given output context current for this thread."""
+        _LOCAL.ctx = ctx
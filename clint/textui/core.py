@@ -15,13 +15,15 @@ import sys
 
 from contextlib import contextmanager
 
-from .formatters import max_width, min_width, _get_max_width_context
-from .cols import columns
-from ..utils import tsplit
+from .colored import display_width
+from .context import get_context, set_context
+from .formatters import max_width, min_width, wrap_lines, _split_lines
+from .cols import columns, table
 
 
-__all__ = ('puts', 'puts_err', 'indent', 'dedent', 'columns', 'max_width',
-    'min_width', 'STDOUT', 'STDERR')
+__all__ = ('puts', 'puts_err', 'indent', 'dedent', 'columns', 'table', 'max_width',
+    'min_width', 'wrap_lines', 'display_width', 'buffered', 'flush', 'STDOUT',
+    'STDERR')
 
 
 STDOUT = sys.stdout.write
@@ -29,10 +31,51 @@ STDERR = sys.stderr.write
 
 NEWLINES = ('\n', '\r', '\r\n')
 
-INDENT_STRINGS = []
+# Number of buffered characters after which a buffered block is written out.
+BUFFER_HIGH_WATER = 64 * 1024
 
 # Private
 
+class _OutputBuffer(object):
+    """Accumulates writes destined for one or more streams.
+
+    Consecutive writes to the same stream are coalesced into a single
+    chunk, and chunks are written out in the order they were received so
+    that interleaved stdout/stderr output keeps its ordering.
+    """
+
+    def __init__(self, high_water=BUFFER_HIGH_WATER):
+        self.high_water = high_water
+        self.depth = 0
+        # Set once the block that created the buffer exits; tasks and
+        # threads which inherited the context may still hold it.
+        self.closed = False
+        self._chunks = []
+        self._size = 0
+
+    def write(self, stream, s):
+        if self._chunks and self._chunks[-1][0] == stream:
+            self._chunks[-1][1].append(s)
+        else:
+            self._chunks.append((stream, [s]))
+
+        self._size += len(s)
+        if self._size >= self.high_water:
+            self.flush()
+
+    def flush(self):
+        chunks, self._chunks, self._size = self._chunks, [], 0
+        for stream, parts in chunks:
+            stream(''.join(parts))
+
+
+def _write(stream, s, buffer=None):
+    """Writes given string to stream, through the output buffer if any."""
+    if buffer is not None and not buffer.closed:
+        buffer.write(stream, s)
+    else:
+        stream(s)
+
 def _indent(indent=0, quote='', indent_char=' '):
     """Indent util function, compute new indent_string"""
     if indent > 0:
@@ -47,39 +90,75 @@ def _indent(indent=0, quote='', indent_char=' '):
         )
 
     if len(indent_string):
-        INDENT_STRINGS.append(indent_string)
+        set_context(get_context().push_indent(indent_string))
 
 # Public
 
 def puts(s='', newline=True, stream=STDOUT):
     """Prints given string to stdout."""
-    max_width_ctx = _get_max_width_context()
-    if max_width_ctx:
-        cols, separator = max_width_ctx[-1]
+    ctx = get_context()
+    if ctx.max_widths:
+        cols, separator = ctx.max_widths[-1]
         s = max_width(s, cols, separator)
 
+    indent = ctx.indent.prefix
+
     if newline:
-        s = tsplit(s, NEWLINES)
+        s = _split_lines(s)
         s = map(str, s)
-        indent = ''.join(INDENT_STRINGS)
 
         s = (str('\n' + indent)).join(s)
 
     _str = ''.join((
-        ''.join(INDENT_STRINGS),
+        indent,
         str(s),
         '\n' if newline else ''
     ))
-    stream(_str)
+    _write(stream, _str, ctx.buffer)
 
 def puts_err(s='', newline=True, stream=STDERR):
     """Prints given string to stderr."""
     puts(s, newline, stream)
 
+def flush():
+    """Writes out everything collected by :func:`buffered` so far."""
+    buffer = get_context().buffer
+    if buffer is not None:
+        buffer.flush()
+
+@contextmanager
+def buffered(high_water=BUFFER_HIGH_WATER):
+    """Buffered output context manager.
+
+    Output from :func:`puts` and :func:`puts_err` is collected in memory
+    and written out in large chunks once ``high_water`` characters have
+    accumulated, on :func:`flush`, and when the outermost block exits.
+    Nested blocks share the outer buffer. Like indentation, the buffer
+    belongs to the current thread or task.
+
+        >>> with buffered():
+        ...     for line in lines:
+        ...         puts(line)
+    """
+    buffer = get_context().buffer
+    if buffer is None or buffer.closed:
+        buffer = _OutputBuffer(high_water)
+        set_context(get_context().replace(buffer=buffer))
+
+    buffer.depth += 1
+    try:
+        yield
+    finally:
+        buffer.depth -= 1
+        if not buffer.depth:
+            set_context(get_context().replace(buffer=None))
+            buffer.closed = True
+            buffer.flush()
+
 def dedent():
     """Dedent next strings, use only if you use indent otherwise than as a
     context."""
-    INDENT_STRINGS.pop()
+    set_context(get_context().pop_indent())
 
 @contextmanager
 def _indent_context():
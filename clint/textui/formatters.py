@@ -11,32 +11,38 @@ Core TextUI functionality for text formatting.
 from __future__ import absolute_import
 from contextlib import contextmanager
 
-from .colored import ColoredString, clean
-from ..utils import tsplit, schunk
+from .colored import ColoredString, StyledText, clean, display_width, _char_width
+from .context import get_context, set_context
+from ..utils import basestring, tsplit
 
 
 NEWLINES = ('\n', '\r', '\r\n')
-MAX_WIDTHS = []
 
 
 def min_width(string, cols, padding=' '):
     """Returns given string with right padding."""
 
-    is_color = isinstance(string, ColoredString)
+    if isinstance(string, (ColoredString, StyledText)):
+        stack = StyledText(string).splitlines()
+        return '\n'.join(str(line.ljust(cols, padding)) for line in stack)
 
-    stack = tsplit(str(string), NEWLINES)
+    if not isinstance(string, basestring):
+        string = str(string)
+    stack = tsplit(string, NEWLINES)
 
     for i, substring in enumerate(stack):
-        _sub = clean(substring).ljust((cols + 0), padding)
-        if is_color:
-            _sub = (_sub.replace(clean(substring), substring))
-        stack[i] = _sub
-        
+        _clean = clean(substring)
+        stack[i] = _clean + padding * max(cols - display_width(_clean), 0)
+
     return '\n'.join(stack)
 
 
-def _get_max_width_context():
-    return MAX_WIDTHS
+def _split_lines(string):
+    """Splits given string, ColoredString or StyledText into lines."""
+    if isinstance(string, StyledText):
+        return string.splitlines()
+    return tsplit(string, NEWLINES)
+
 
 @contextmanager
 def _max_width_context():
@@ -44,7 +50,8 @@ def _max_width_context():
     try:
         yield
     finally:
-        MAX_WIDTHS.pop()
+        ctx = get_context()
+        set_context(ctx.replace(max_widths=ctx.max_widths[:-1]))
 
 def max_width(*args, **kwargs):
     """Returns formatted text or context manager for textui:puts.
@@ -79,75 +86,123 @@ def max_width(*args, **kwargs):
         string, cols = cols, string
 
     if string is None:
-        MAX_WIDTHS.append((cols, separator))
+        ctx = get_context()
+        set_context(ctx.replace(max_widths=ctx.max_widths + ((cols, separator), )))
         return _max_width_context()
     else:
         return _max_width_formatter(string, cols, separator)
 
 
+def _wchunk(word, cols):
+    """Splits word into chunks at most cols terminal columns wide."""
+    text = word.plain if isinstance(word, StyledText) else word
+
+    if len(text) == display_width(text):
+        return [word[i:i + cols] for i in range(0, len(text), cols)]
+
+    chunks = []
+    chunk_start = chunk_width = 0
+    for i, c in enumerate(text):
+        w = _char_width(c)
+        if chunk_width + w > cols and i > chunk_start:
+            chunks.append(word[chunk_start:i])
+            chunk_start, chunk_width = i, 0
+        chunk_width += w
+    chunks.append(word[chunk_start:])
+    return chunks
+
+
+def _wrap_words(words, cols):
+    """Greedily packs an iterable of words into rows no wider than cols.
+
+    Widths are measured in terminal columns. Yields each row as a list of
+    words as soon as it is complete; words wider than cols are split into
+    chunks spread over several rows.
+    """
+
+    row = []
+    row_width = 0  # width of the row's words, each followed by a space
+
+    for word in words:
+        word_width = display_width(word)
+
+        if (row_width + word_width) <= cols:
+            row.append(word)
+            row_width += word_width + 1
+
+        elif word_width > cols:
+
+            # ensure empty row
+            if row:
+                yield row
+
+            chunks = _wchunk(word, cols)
+            for chunk in chunks[:-1]:
+                yield [chunk]
+
+            row = [chunks[-1]]
+            row_width = display_width(chunks[-1]) + 1
+        else:
+            yield row
+            row = [word]
+            row_width = word_width + 1
+
+    yield row
+
+
+def wrap_lines(lines, cols):
+    """Wraps lines of text to a given width, one line at a time.
+
+    Accepts any iterable of lines, e.g. an open file, and yields the
+    wrapped rows as they are produced, so only one line is held in memory
+    at a time.
+
+        >>> with open('huge.log') as f:
+        ...     for row in wrap_lines(f, 80):
+        ...         puts(row)
+
+    :param lines: string, file object or iterable of lines
+    :param cols: max width of the wrapped rows
+    :type cols: int
+    """
+
+    if isinstance(lines, basestring):
+        lines = tsplit(lines, NEWLINES)
+
+    for line in lines:
+        for row in _wrap_words(line.split(), cols):
+            yield ' '.join(row)
+
+
 def _max_width_formatter(string, cols, separator='\n'):
     """Returns a freshly formatted
     :param string: string to be formatted
-    :type string: basestring or clint.textui.colored.ColoredString
+    :type string: basestring, clint.textui.colored.ColoredString or
+        clint.textui.colored.StyledText
     :param cols: max width the text to be formatted
     :type cols: int
     :param separator: separator to break rows
     :type separator: basestring
     """
 
+    if isinstance(string, StyledText):
+        space, separator = StyledText(' '), StyledText(separator)
+        return StyledText('\n').join(
+            separator.join(space.join(row) for row in _wrap_words(line.split(), cols))
+            for line in string.splitlines()
+        )
+
     is_color = isinstance(string, ColoredString)
 
     if is_color:
         string_copy = string._new('')
         string = string.s
 
-    stack = tsplit(string, NEWLINES)
-
-    for i, substring in enumerate(stack):
-        stack[i] = substring.split()
-
-    _stack = []
-    
-    for row in stack:
-        _row = ['',]
-        _row_i = 0
-
-        for word in row:
-            if (len(_row[_row_i]) + len(word)) <= cols:
-                _row[_row_i] += word
-                _row[_row_i] += ' '
-                
-            elif len(word) > cols:
-
-                # ensure empty row
-                if len(_row[_row_i]):
-                    _row[_row_i] = _row[_row_i].rstrip()
-                    _row.append('')
-                    _row_i += 1
-
-                chunks = schunk(word, cols)
-                for i, chunk in enumerate(chunks):
-                    if not (i + 1) == len(chunks):
-                        _row[_row_i] += chunk
-                        _row[_row_i] = _row[_row_i].rstrip()
-                        _row.append('')
-                        _row_i += 1
-                    else:
-                        _row[_row_i] += chunk
-                        _row[_row_i] += ' '
-            else:
-                _row[_row_i] = _row[_row_i].rstrip()
-                _row.append('')
-                _row_i += 1
-                _row[_row_i] += word
-                _row[_row_i] += ' '
-        else:
-            _row[_row_i] = _row[_row_i].rstrip()
-
-        _row = map(str, _row)
-        _stack.append(separator.join(_row))
+    _s = '\n'.join(
+        separator.join(' '.join(row) for row in _wrap_words(line.split(), cols))
+        for line in tsplit(string, NEWLINES)
+    )
 
-    _s = '\n'.join(_stack)
     if is_color:
         _s = string_copy._new(_s)
     return _s
@@ -10,25 +10,225 @@ This module provides the progressbar functionality.
 
 from __future__ import absolute_import
 
+import os
 import sys
+import threading
 import time
+from collections import deque
+
+from .colored import display_width
+from .cols import cached_console_width
+
+try:
+    from operator import length_hint
+except ImportError:
+    def length_hint(obj, default=0):
+        try:
+            return len(obj)
+        except TypeError:
+            try:
+                return type(obj).__length_hint__(obj)
+            except (AttributeError, TypeError):
+                return default
 
 STREAM = sys.stderr
 
 BAR_TEMPLATE = '%s[%s%s] %i/%i - %s\r'
+BAR_RATE_TEMPLATE = '%s[%s%s] %i/%i - %s - %s\r'
+BAR_SIZE_TEMPLATE = '%s[%s%s] %s/%s - %s - %s\r'
+# Used when the total is unknown: label, count, elapsed time, rate
+BAR_INDETERMINATE_TEMPLATE = '%s%s - %s - %s\r'
 MILL_TEMPLATE = '%s %s %i/%i\r'
+MILL_INDETERMINATE_TEMPLATE = '%s %s %i\r'
 
 DOTS_CHAR = '.'
 BAR_FILLED_CHAR = '#'
 BAR_EMPTY_CHAR = ' '
 MILL_CHARS = ['|', '/', '-', '\\']
 
+# Bar width that fills the terminal
+AUTO_WIDTH = 'auto'
+
 # How long to wait before recalculating the ETA
 ETA_INTERVAL = 1
 # How many intervals (excluding the current one) to calculate the simple moving
 # average
 ETA_SMA_WINDOW = 9
 
+# Seconds between redraws of threaded bars without max_refresh
+RENDER_INTERVAL = 0.1
+# Seconds between summary lines of a MultiBar whose STREAM is not a terminal
+SUMMARY_INTERVAL = 5
+
+# Cursor movement for redrawing lines above the current one
+CURSOR_UP = '\x1b[%iA'
+CURSOR_DOWN = '\x1b[%iB'
+CLEAR_LINE = '\x1b[K'
+
+SIZE_UNITS = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
+
+
+def format_size(size):
+    """Returns given number of bytes in human readable form."""
+    for unit in SIZE_UNITS[:-1]:
+        if abs(size) < 1024:
+            break
+        size /= 1024.0
+    else:
+        unit = SIZE_UNITS[-1]
+    if unit == 'B':
+        return '%i B' % size
+    return '%.1f %s' % (size, unit)
+
+
+def format_rate(rate, unit='it'):
+    """Returns given throughput in human readable form. Rates in bytes
+    (unit ``'B'``) are scaled to KB/s, MB/s etc."""
+    if unit == 'B':
+        return '%s/s' % format_size(rate)
+    return '%.1f %s/s' % (rate, unit)
+
+
+def _length(it):
+    """Returns the length of given iterable, falling back to its length
+    hint, or None if it is unknown."""
+    try:
+        return len(it)
+    except TypeError:
+        return length_hint(it, 0) or None
+
+
+class Estimator(object):
+    """Base class for rate estimators used by :class:`Bar` for the ETA.
+
+    Estimators are told about progress with :meth:`update`, which returns
+    True when the estimate changed, and report a :attr:`rate` in items
+    per second. Each update costs O(1).
+    """
+
+    rate = 0.0
+
+    def update(self, progress, now):
+        raise NotImplementedError
+
+    def eta(self, remaining):
+        """Returns the seconds needed for given number of items."""
+        if not self.rate:
+            return 0
+        return remaining / self.rate
+
+
+class SMAEstimator(Estimator):
+    """Simple moving average of the time per item, sampled every
+    ``interval`` seconds over the last ``window`` samples. This is how
+    clint has always estimated the ETA.
+    """
+
+    def __init__(self, window=ETA_SMA_WINDOW + 1, interval=ETA_INTERVAL):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.total = 0.0
+        self.start = self.last = time.time()
+
+    def update(self, progress, now):
+        if (now - self.last) <= self.interval:
+            return False
+        self.last = now
+        if len(self.samples) == self.samples.maxlen:
+            self.total -= self.samples[0]
+        sample = (now - self.start) / (progress + 1)
+        self.samples.append(sample)
+        self.total += sample
+        return True
+
+    @property
+    def rate(self):
+        if not self.samples or not self.total:
+            return 0.0
+        return len(self.samples) / self.total
+
+    def eta(self, remaining):
+        if not self.samples:
+            return 0
+        return self.total / len(self.samples) * remaining
+
+
+class EWMAEstimator(Estimator):
+    """Exponentially weighted moving average of the throughput, sampled
+    every ``interval`` seconds. Higher ``alpha`` follows changes in
+    throughput more quickly."""
+
+    def __init__(self, alpha=0.3, interval=ETA_INTERVAL):
+        self.alpha = alpha
+        self.interval = interval
+        self.last = time.time()
+        self.last_progress = 0
+        self.current = None
+
+    def update(self, progress, now):
+        elapsed = now - self.last
+        if elapsed <= self.interval:
+            return False
+        current = (progress - self.last_progress) / elapsed
+        if self.current is None:
+            self.current = current
+        else:
+            self.current += self.alpha * (current - self.current)
+        self.last, self.last_progress = now, progress
+        return True
+
+    @property
+    def rate(self):
+        return self.current or 0.0
+
+
+class WindowEstimator(Estimator):
+    """Throughput over a sliding window of the last ``window`` samples,
+    taken every ``interval`` seconds and kept in a ring buffer."""
+
+    def __init__(self, window=10, interval=ETA_INTERVAL):
+        self.interval = interval
+        self.samples = deque([(time.time(), 0)], maxlen=window + 1)
+
+    def update(self, progress, now):
+        if (now - self.samples[-1][0]) <= self.interval:
+            return False
+        self.samples.append((now, progress))
+        return True
+
+    @property
+    def rate(self):
+        (start, first), (end, last) = self.samples[0], self.samples[-1]
+        if end <= start:
+            return 0.0
+        return (last - first) / (end - start)
+
+
+class _Renderer(threading.Thread):
+    """Daemon thread redrawing a bar at a fixed interval, so the iterating
+    thread only has to store its progress."""
+
+    def __init__(self, bar, interval):
+        super(_Renderer, self).__init__()
+        self.daemon = True
+        self.bar = bar
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        drawn = None
+        while True:
+            progress = self.bar.last_progress
+            if progress != drawn:
+                self.bar.draw(progress)
+                drawn = progress
+            if self.stopped.wait(self.interval):
+                break
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
 
 class Bar(object):
     def __enter__(self):
@@ -39,9 +239,11 @@ class Bar(object):
         return False  # we're not suppressing exceptions
 
     def __init__(self, label='', width=32, hide=None, empty_char=BAR_EMPTY_CHAR,
-                 filled_char=BAR_FILLED_CHAR, expected_size=None, every=1):
+                 filled_char=BAR_FILLED_CHAR, expected_size=None, every=1,
+                 max_refresh=None, threaded=False, estimator=None, unit=None):
         self.label = label
-        self.width = width
+        self.auto_width = width == AUTO_WIDTH
+        self.width = 0 if self.auto_width else width
         self.hide = hide
         # Only show bar in terminals by default (better for piping, logging etc.)
         if hide is None:
@@ -53,49 +255,104 @@ class Bar(object):
         self.filled_char =   filled_char
         self.expected_size = expected_size
         self.every =         every
+        self.max_refresh =   max_refresh
+        self.next_redraw =   0
         self.start =         time.time()
-        self.ittimes =       []
+        self.estimator =     estimator or SMAEstimator()
+        self.unit =          unit
         self.eta =           0
-        self.etadelta =      time.time()
         self.etadisp =       self.format_time(self.eta)
         self.last_progress = 0
+        self.renderer =      None
+        if threaded and not self.hide:
+            self.renderer = _Renderer(
+                self, 1.0 / max_refresh if max_refresh else RENDER_INTERVAL)
+            self.renderer.start()
         if (self.expected_size):
             self.show(0)
 
     def show(self, progress, count=None):
         if count is not None:
             self.expected_size = count
-        if self.expected_size is None:
-            raise Exception("expected_size not initialized")
         self.last_progress = progress
-        if (time.time() - self.etadelta) > ETA_INTERVAL:
-            self.etadelta = time.time()
-            self.ittimes = \
-                self.ittimes[-ETA_SMA_WINDOW:] + \
-                    [-(self.start - time.time()) / (progress+1)]
-            self.eta = \
-                sum(self.ittimes) / float(len(self.ittimes)) * \
-                (self.expected_size - progress)
-            self.etadisp = self.format_time(self.eta)
-        x = int(self.width * progress / self.expected_size)
+        if self.renderer is not None:
+            # The renderer thread picks the new progress up by itself
+            return
+        if self.max_refresh:
+            # Between redraws there is nothing to do, except for the last one
+            now = time.time()
+            if now < self.next_redraw and progress != self.expected_size:
+                return
+            self.next_redraw = now + 1.0 / self.max_refresh
         if not self.hide:
-            if ((progress % self.every) == 0 or      # True every "every" updates
+            if (self.max_refresh or                  # Already rate limited
+                (progress % self.every) == 0 or      # True every "every" updates
                 (progress == self.expected_size)):   # And when we're done
-                STREAM.write(BAR_TEMPLATE % (
-                    self.label, self.filled_char * x,
-                    self.empty_char * (self.width - x), progress,
-                    self.expected_size, self.etadisp))
-                STREAM.flush()
+                self.draw(progress)
+
+    def draw(self, progress):
+        """Writes the bar for given progress to STREAM."""
+        STREAM.write(self.render(progress))
+        STREAM.flush()
+
+    def render(self, progress):
+        """Returns the bar for given progress."""
+        now = time.time()
+        updated = self.estimator.update(progress, now)
+        if self.expected_size is None:
+            return self._format(0, progress, self.format_time(now - self.start),
+                                self.estimator.rate)
+        if updated:
+            self.eta = self.estimator.eta(self.expected_size - progress)
+            self.etadisp = self.format_time(self.eta)
+        if self.auto_width:
+            self._fit(progress, self.etadisp, self.estimator.rate)
+        x = min(int(self.width * progress / self.expected_size), self.width)
+        return self._format(x, progress, self.etadisp, self.estimator.rate)
+
+    def _fit(self, progress, timedisp, rate):
+        """Sizes the bar to fill the console next to label and stats."""
+        self.width = 0
+        line = self._format(0, progress, timedisp, rate).rstrip('\r')
+        used = display_width(line)
+        # Leave the last column free so the line never wraps
+        self.width = max(cached_console_width() - used - 1, 1)
+
+    def _format(self, x, progress, timedisp, rate):
+        if self.expected_size is None:
+            return BAR_INDETERMINATE_TEMPLATE % (
+                self.label,
+                format_size(progress) if self.unit == 'B' else progress,
+                timedisp, format_rate(rate, self.unit or 'it'))
+        if self.unit == 'B':
+            return BAR_SIZE_TEMPLATE % (
+                self.label, self.filled_char * x,
+                self.empty_char * (self.width - x), format_size(progress),
+                format_size(self.expected_size), timedisp,
+                format_rate(rate, self.unit))
+        if self.unit is None:
+            return BAR_TEMPLATE % (
+                self.label, self.filled_char * x,
+                self.empty_char * (self.width - x), progress,
+                self.expected_size, timedisp)
+        return BAR_RATE_TEMPLATE % (
+            self.label, self.filled_char * x,
+            self.empty_char * (self.width - x), progress,
+            self.expected_size, timedisp, format_rate(rate, self.unit))
 
     def done(self):
+        if self.renderer is not None:
+            self.renderer.stop()
+            self.renderer = None
         self.elapsed = time.time() - self.start
         elapsed_disp = self.format_time(self.elapsed)
         if not self.hide:
-            # Print completed bar with elapsed time
-            STREAM.write(BAR_TEMPLATE % (
-                self.label, self.filled_char * self.width,
-                self.empty_char * 0, self.last_progress,
-                self.expected_size, elapsed_disp))
+            # Print completed bar with elapsed time and average rate
+            rate = self.last_progress / self.elapsed if self.elapsed else 0.0
+            if self.auto_width:
+                self._fit(self.last_progress, elapsed_disp, rate)
+            STREAM.write(self._format(
+                self.width, self.last_progress, elapsed_disp, rate))
             STREAM.write('\n')
             STREAM.flush()
 
@@ -103,33 +360,256 @@ class Bar(object):
         return time.strftime('%H:%M:%S', time.gmtime(seconds))
 
 
+class MultiBar(object):
+    """A group of stacked progress bars, one line each, for parallel
+    workers.
+
+        >>> with progress.MultiBar() as bars:
+        ...     shards = [bars.add('shard %i ' % i, len(s)) for i, s in ...]
+        ...     bars.update(shards[0], 10)
+
+    :meth:`update` may be called from any thread. Worker processes can put
+    ``(index, progress)`` tuples on the queue returned by :meth:`queue`.
+    Only bars that changed are redrawn, at most ``max_refresh`` times per
+    second. When STREAM is not a terminal, a one-line summary of all bars
+    is printed every ``summary_interval`` seconds instead.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.done()
+        return False  # we're not suppressing exceptions
+
+    def __init__(self, width=32, hide=False, max_refresh=10,
+                 summary_interval=SUMMARY_INTERVAL):
+        self.width = width
+        self.hide = hide
+        try:
+            self.tty = STREAM.isatty()
+        except AttributeError:  # output does not support isatty()
+            self.tty = False
+        self.interval = 1.0 / max_refresh if self.tty else summary_interval
+        self.bars = []
+        self.drawn = []
+        self.lock = threading.RLock()
+        self.next_redraw = 0
+        self._queue = None
+        self._listener = None
+
+    def add(self, label='', expected_size=None):
+        """Adds a bar below the existing ones and returns its index."""
+        with self.lock:
+            bar = Bar(label=label, width=self.width, hide=True,
+                      expected_size=expected_size)
+            self.bars.append(bar)
+            self.drawn.append(0)
+            if self.tty and not self.hide:
+                STREAM.write(self._line(bar) + '\n')
+                STREAM.flush()
+            return len(self.bars) - 1
+
+    def update(self, index, progress):
+        """Sets the progress of the bar at given index."""
+        with self.lock:
+            self.bars[index].last_progress = progress
+            now = time.time()
+            if now >= self.next_redraw:
+                self.next_redraw = now + self.interval
+                self.redraw()
+
+    def queue(self):
+        """Returns a multiprocessing queue that worker processes can put
+        ``(index, progress)`` tuples on."""
+        with self.lock:
+            if self._queue is None:
+                import multiprocessing
+                self._queue = multiprocessing.Queue()
+                self._listener = threading.Thread(target=self._listen)
+                self._listener.daemon = True
+                self._listener.start()
+            return self._queue
+
+    def _listen(self):
+        for index, progress in iter(self._queue.get, None):
+            self.update(index, progress)
+
+    def _line(self, bar):
+        return bar.render(bar.last_progress).rstrip('\r')
+
+    def redraw(self, force=False):
+        """Redraws bars that changed since they were last drawn."""
+        with self.lock:
+            if self.hide or not self.bars:
+                return
+            if not self.tty:
+                STREAM.write(', '.join(
+                    '%s%i' % (bar.label, bar.last_progress)
+                    if bar.expected_size is None else
+                    '%s%i/%i' % (bar.label, bar.last_progress, bar.expected_size)
+                    for bar in self.bars) + '\n')
+                STREAM.flush()
+                return
+
+            _out = []
+            lines = len(self.bars)
+            for i, bar in enumerate(self.bars):
+                if force or self.drawn[i] != bar.last_progress:
+                    _out.append(''.join((
+                        CURSOR_UP % (lines - i), '\r', self._line(bar),
+                        CLEAR_LINE, CURSOR_DOWN % (lines - i), '\r')))
+                    self.drawn[i] = bar.last_progress
+            if _out:
+                STREAM.write(''.join(_out))
+                STREAM.flush()
+
+    def done(self):
+        """Waits for queued updates and draws the final state of all bars."""
+        if self._queue is not None:
+            self._queue.put(None)
+            self._listener.join()
+            self._queue = None
+        self.redraw(force=True)
+
+
+class ProgressFile(object):
+    """Wraps a binary file object, showing a progress bar of the bytes
+    read from or written to it.
+
+        >>> with open('big.iso', 'rb') as src, open('copy.iso', 'wb') as dst:
+        ...     with progress.ProgressFile(src, label='copying ') as f:
+        ...         shutil.copyfileobj(f, dst)
+
+    The bar is updated once per read/write call rather than per byte, and
+    redrawn at most ``max_refresh`` times per second. ``readinto`` is
+    passed through, so callers can copy into a preallocated buffer. When
+    ``expected_size`` is not given the remaining size of regular files is
+    used; for other streams the bar shows bytes transferred and the rate.
+    Other attributes are taken from the wrapped file object.
+    """
+
+    def __init__(self, fileobj, expected_size=None, label='', width=32,
+                 hide=None, max_refresh=10, estimator=None):
+        if expected_size is None:
+            expected_size = self._remaining_size(fileobj)
+        self.fileobj = fileobj
+        self.transferred = 0
+        self.bar = Bar(label=label, width=width, hide=hide,
+                       expected_size=expected_size, max_refresh=max_refresh,
+                       estimator=estimator, unit='B')
+
+    @staticmethod
+    def _remaining_size(fileobj):
+        try:
+            size = os.fstat(fileobj.fileno()).st_size
+            return max(size - fileobj.tell(), 0) if size else None
+        except (AttributeError, IOError, OSError, ValueError):
+            return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.done()
+        return False  # we're not suppressing exceptions
+
+    def __getattr__(self, att):
+        return getattr(self.fileobj, att)
+
+    def __iter__(self):
+        for line in self.fileobj:
+            self._advance(len(line))
+            yield line
+
+    def _advance(self, n):
+        if n:
+            self.transferred += n
+            self.bar.show(self.transferred)
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self._advance(len(data))
+        return data
+
+    def read1(self, size=-1):
+        data = self.fileobj.read1(size)
+        self._advance(len(data))
+        return data
+
+    def readline(self, size=-1):
+        data = self.fileobj.readline(size)
+        self._advance(len(data))
+        return data
+
+    def readinto(self, b):
+        n = self.fileobj.readinto(b)
+        self._advance(n)
+        return n
+
+    def write(self, b):
+        n = self.fileobj.write(b)
+        # Python 2 file objects return None from write()
+        self._advance(len(b) if n is None else n)
+        return n
+
+    def done(self):
+        """Prints the final state of the bar."""
+        self.bar.done()
+
+
 def bar(it, label='', width=32, hide=None, empty_char=BAR_EMPTY_CHAR,
-        filled_char=BAR_FILLED_CHAR, expected_size=None, every=1):
-    """Progress iterator. Wrap your iterables with it."""
+        filled_char=BAR_FILLED_CHAR, expected_size=None, every=1,
+        max_refresh=None, threaded=False, estimator=None, unit=None):
+    """Progress iterator. Wrap your iterables with it.
+
+    Pass ``max_refresh`` to redraw the bar at most that many times per
+    second instead of every ``every`` items. With ``threaded=True`` the
+    bar is redrawn by a background thread and iterating only records the
+    progress. ``estimator`` picks how the ETA is calculated (see
+    :class:`SMAEstimator`) and ``unit`` adds the throughput, e.g. 'it'
+    for items per second. Pass ``width='auto'`` to fill the terminal.
 
-    count = len(it) if expected_size is None else expected_size
+    Iterables without a length (or length hint) are streamed as they are,
+    showing the count, elapsed time and rate instead of a bar.
+    """
+
+    count = _length(it) if expected_size is None else expected_size
 
     with Bar(label=label, width=width, hide=hide, empty_char=empty_char,
-             filled_char=filled_char, expected_size=count, every=every) \
+             filled_char=filled_char, expected_size=count, every=every,
+             max_refresh=max_refresh, threaded=threaded,
+             estimator=estimator, unit=unit) \
             as bar:
         for i, item in enumerate(it):
             yield item
             bar.show(i + 1)
 
 
-def dots(it, label='', hide=None, every=1):
-    """Progress iterator. Prints a dot for each item being iterated"""
+def dots(it, label='', hide=None, every=1, max_refresh=None):
+    """Progress iterator. Prints a dot for each item being iterated
+
+    Pass ``max_refresh`` to print at most that many dots per second
+    instead of one every ``every`` items.
+    """
 
     count = 0
+    next_redraw = 0
 
     if not hide:
         STREAM.write(label)
 
     for i, item in enumerate(it):
         if not hide:
-            if i % every == 0:         # True every "every" updates
+            if max_refresh:
+                now = time.time()
+                if now >= next_redraw:
+                    next_redraw = now + 1.0 / max_refresh
+                    STREAM.write(DOTS_CHAR)
+                    STREAM.flush()
+            elif i % every == 0:         # True every "every" updates
                 STREAM.write(DOTS_CHAR)
-                sys.stderr.flush()
+                STREAM.flush()
 
         count += 1
 
@@ -139,33 +619,64 @@ def dots(it, label='', hide=None, every=1):
     STREAM.flush()
 
 
-def mill(it, label='', hide=None, expected_size=None, every=1):
-    """Progress iterator. Prints a mill while iterating over the items."""
+def mill(it, label='', hide=None, expected_size=None, every=1,
+         max_refresh=None):
+    """Progress iterator. Prints a mill while iterating over the items.
+
+    Pass ``max_refresh`` to redraw the mill at most that many times per
+    second instead of every ``every`` items. Iterables without a length
+    (or length hint) only show the count.
+    """
+
+    redraws = [0, 0]  # number of redraws, time of next redraw
 
     def _mill_char(_i):
-        if _i >= count:
+        if count is not None and _i >= count:
             return ' '
+        elif max_refresh:
+            return MILL_CHARS[redraws[0] % len(MILL_CHARS)]
         else:
             return MILL_CHARS[(_i // every) % len(MILL_CHARS)]
 
     def _show(_i):
         if not hide:
-            if ((_i % every) == 0 or         # True every "every" updates
-                (_i == count)):            # And when we're done
-
+            if max_refresh:
+                now = time.time()
+                if now < redraws[1] and _i != count:
+                    return
+                redraws[0] += 1
+                redraws[1] = now + 1.0 / max_refresh
+            elif not ((_i % every) == 0 or     # True every "every" updates
+                      (_i == count)):          # And when we're done
+                return
+
+            if count is None:
+                STREAM.write(MILL_INDETERMINATE_TEMPLATE % (
+                    label, _mill_char(_i), _i))
+            else:
                 STREAM.write(MILL_TEMPLATE % (
                     label, _mill_char(_i), _i, count))
-                STREAM.flush()
+            STREAM.flush()
 
-    count = len(it) if expected_size is None else expected_size
+    count = _length(it) if expected_size is None else expected_size
 
     if count:
         _show(0)
 
-    for i, item in enumerate(it):
+    i = 0
+    for i, item in enumerate(it, 1):
         yield item
-        _show(i + 1)
+        _show(i)
+
+    if count is None:
+        # Now that the total is known, show the final state
+        count = i
+        _show(i)
 
     if not hide:
         STREAM.write('\n')
         STREAM.flush()
+
+
+if sys.version_info >= (3, 6):
+    from ._aprogress import abar, adots, amill, as_completed
@@ -13,31 +13,350 @@ from __future__ import with_statement
 
 import errno
 import os.path
+import re
+from fnmatch import translate
 from os import makedirs
-from glob import glob
+
+try:
+    from os import scandir
+except ImportError:  # Python < 3.5
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+except ImportError:  # Python < 3.2
+    ThreadPoolExecutor = None
 
 try:
     basestring = basestring
 except NameError:
     basestring = str
 
-def expand_path(path):
-    """Expands directories and globs in given path."""
+try:
+    from functools import lru_cache
+except ImportError:
+    def lru_cache(maxsize=128):
+        """Minimal stand-in for functools.lru_cache on older Pythons.
+        Caches results of a single-argument function and starts over once
+        maxsize entries are stored."""
+        def decorator(func):
+            cache = {}
+
+            def wrapper(arg):
+                try:
+                    return cache[arg]
+                except KeyError:
+                    if len(cache) >= maxsize:
+                        cache.clear()
+                    result = cache[arg] = func(arg)
+                    return result
+
+            wrapper.cache_clear = cache.clear
+            return wrapper
+        return decorator
+
+# Characters that make a path component a glob pattern
+GLOB_MAGIC_RE = re.compile(r'[*?[]')
+
+
+class _DirEntry(object):
+    """Stand-in for os.DirEntry where os.scandir is not available."""
+
+    def __init__(self, dir, name):
+        self.name = name
+        self.path = os.path.join(dir, name)
+
+    def is_dir(self, follow_symlinks=True):
+        if not follow_symlinks and self.is_symlink():
+            return False
+        return os.path.isdir(self.path)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+
+def _scandir(path):
+    """Lists the entries of a directory ('' being the current one), or
+    none if it can't be read."""
+    try:
+        if scandir is not None:
+            return list(scandir(path or os.curdir))
+        return [_DirEntry(path, name) for name in os.listdir(path or os.curdir)]
+    except OSError:  # vanished or unreadable, like os.walk
+        return []
+
+
+def _join(dir, name):
+    return os.path.join(dir, name) if dir else name
+
+
+def _compile_globs(patterns):
+    """Compiles glob patterns (or a single one) into a single regex, or
+    None if there are none."""
+    if not patterns:
+        return None
+    if isinstance(patterns, basestring):
+        patterns = [patterns]
+    return re.compile('|'.join('(?:%s)' % translate(p) for p in patterns))
+
+
+@lru_cache(maxsize=256)
+def _glob_matcher(pattern):
+    return re.compile(translate(os.path.normcase(pattern))).match
+
+
+def _dir_key(path):
+    """Identifies a directory by device and inode, else returns None."""
+    try:
+        st = os.stat(path or os.curdir)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _subdirs(dirs, ancestors):
+    """Pairs directories with their ancestors' keys, dropping those which
+    are their own ancestors (symlink loops). Without ancestors (symlinks
+    not followed) there can't be loops."""
+    if ancestors is None:
+        return [(dir, None) for dir in dirs]
+
+    _dirs = []
+    for dir in dirs:
+        key = _dir_key(dir)
+        if key is not None and key not in ancestors:
+            _dirs.append((dir, ancestors | frozenset([key])))
+    return _dirs
+
+
+def _scan_dir(path, include=None, exclude=None, follow_symlinks=False):
+    """Lists the files (as entries) and subdirectories (as paths) of a
+    directory, using the type information that comes with the entries
+    rather than stat calls."""
+
+    files = []
+    dirs = []
+
+    for entry in _scandir(path):
+        if exclude is not None and exclude.match(entry.name):
+            continue
+        if entry.is_dir():
+            # like os.walk, symlinks to directories are skipped unless followed
+            if follow_symlinks or not entry.is_symlink():
+                dirs.append(_join(path, entry.name))
+        elif include is None or include.match(entry.name):
+            files.append(entry)
+
+    return files, dirs
+
+
+def _walk(top, include=None, exclude=None, follow_symlinks=False, workers=None):
+    """Yields the entries of the files in top and below it. With
+    workers, directories are listed on a thread pool."""
+
+    ancestors = frozenset([_dir_key(top)]) if follow_symlinks else None
+
+    if not workers or ThreadPoolExecutor is None:
+        stack = [(top, ancestors)]
+        while stack:
+            dir, ancestors = stack.pop()
+            files, dirs = _scan_dir(dir, include, exclude, follow_symlinks)
+            for entry in files:
+                yield entry
+            stack.extend(reversed(_subdirs(dirs, ancestors)))
+        return
+
+    pool = ThreadPoolExecutor(workers)
+    pending = {}  # future: ancestors of the directory it lists
+
+    def _submit(dir, ancestors):
+        future = pool.submit(_scan_dir, dir, include, exclude, follow_symlinks)
+        pending[future] = ancestors
+
+    _submit(top, ancestors)
+    try:
+        while pending:
+            done = wait(pending, return_when=FIRST_COMPLETED)[0]
+            for future in done:
+                ancestors = pending.pop(future)
+                files, dirs = future.result()
+                for dir, _ancestors in _subdirs(dirs, ancestors):
+                    _submit(dir, _ancestors)
+                for entry in files:
+                    yield entry
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def _glob_tree(top, follow_symlinks):
+    """Yields (path, walked) for top and everything below it, skipping
+    hidden names, like the ``**`` glob. walked is None for files, and
+    False for symlinks to directories which aren't walked into."""
+
+    stack = [(top, frozenset([_dir_key(top)]) if follow_symlinks else None)]
+    while stack:
+        dir, ancestors = stack.pop()
+        yield dir, True
+
+        subdirs = []
+        for entry in _scandir(dir):
+            if entry.name.startswith('.'):
+                continue
+            path = _join(dir, entry.name)
+            if not entry.is_dir():
+                yield path, None
+            elif follow_symlinks or not entry.is_symlink():
+                subdirs.append(path)
+            else:
+                yield path, False
+
+        walked = _subdirs(subdirs, ancestors)
+        if len(walked) < len(subdirs):
+            # symlink loops are listed but not walked into again
+            looped = set(subdirs) - set(path for path, _ in walked)
+            for path in subdirs:
+                if path in looped:
+                    yield path, False
+        stack.extend(reversed(walked))
+
+
+def _glob(dir, parts, dir_only, follow_symlinks):
+    """Yields the paths below dir matching given path components."""
+
+    part, rest = parts[0], parts[1:]
+
+    if part == '**':
+        tree = _glob_tree(dir, follow_symlinks)
+        if not rest:
+            for path, walked in tree:
+                if not path:
+                    continue  # the current directory, which glob leaves out
+                if walked is not None:
+                    yield os.path.join(path, '') if dir_only or path == dir else path
+                elif not dir_only:
+                    yield path
+            return
+        for path, walked in tree:
+            if walked:
+                for match in _glob(path, rest, dir_only, follow_symlinks):
+                    yield match
+
+    elif GLOB_MAGIC_RE.search(part):
+        match = _glob_matcher(part)
+        hidden = part.startswith('.')
+        for entry in _scandir(dir):
+            name = entry.name
+            if (name.startswith('.') and not hidden) or not match(os.path.normcase(name)):
+                continue
+            path = _join(dir, name)
+            if rest:
+                if entry.is_dir():
+                    for match_ in _glob(path, rest, dir_only, follow_symlinks):
+                        yield match_
+            elif not dir_only:
+                yield path
+            elif entry.is_dir():
+                yield os.path.join(path, '')
+
+    else:
+        path = _join(dir, part)
+        if rest:
+            if os.path.isdir(path):
+                for match in _glob(path, rest, dir_only, follow_symlinks):
+                    yield match
+        elif dir_only:
+            if os.path.isdir(path):
+                yield os.path.join(path, '')
+        elif os.path.lexists(path):
+            yield path
+
+
+def iexpand_path(path, follow_symlinks=False):
+    """Expands directories and globs in given path, yielding the paths as
+    they are found.
+
+    Directories expand to all the files below them. Globs support ``**``
+    for any number of directories; only the directories matching each
+    component of the pattern are listed. Symlinks to directories are only
+    walked into with follow_symlinks, and never into one of their own
+    ancestors so that symlink loops end.
+    """
 
-    paths = []
     path = os.path.expanduser(path)
     path = os.path.expandvars(path)
 
     if os.path.isdir(path):
+        for entry in _walk(path, follow_symlinks=follow_symlinks):
+            yield entry.path
+        return
 
-        for (dir, dirs, files) in os.walk(path):
-            for file in files:
-                paths.append(os.path.join(dir, file))
-    else:
-        paths.extend(glob(path))
+    if not GLOB_MAGIC_RE.search(path):
+        if os.path.lexists(path):
+            yield path
+        return
+
+    drive, path = os.path.splitdrive(path)
+    if os.path.altsep:
+        path = path.replace(os.path.altsep, os.sep)
+
+    parts = path.split(os.sep)
+    dir_only = not parts[-1]
+
+    # Components before the first pattern make the directory to start from
+    i = 0
+    while not GLOB_MAGIC_RE.search(parts[i]):
+        i += 1
+    top = drive + (os.sep.join(parts[:i]) or (os.sep if i else ''))
+    parts = [part for part in parts[i:] if part]
+
+    if not os.path.isdir(top or os.curdir):
+        return
+
+    for match in _glob(top, parts, dir_only, follow_symlinks):
+        yield match
+
+
+def expand_path(path):
+    """Expands directories and globs in given path."""
 
-    return paths
+    return list(iexpand_path(path))
+
+
+def iter_files(path, include=None, exclude=None, workers=None):
+    """Yields the existing files in given directory (and below it), or
+    the existing paths matching given glob, as they are found.
+
+    include and exclude are glob patterns (or lists thereof) for file
+    names; excluded directories aren't entered. With workers, directories
+    are listed in that many threads, in no particular order.
+    """
+
+    path = os.path.expanduser(path)
+    path = os.path.expandvars(path)
+
+    include = _compile_globs(include)
+    exclude = _compile_globs(exclude)
+
+    if os.path.isdir(path):
+        for entry in _walk(path, include, exclude, workers=workers):
+            # only links need checking, they may be broken
+            if not entry.is_symlink() or os.path.exists(entry.path):
+                yield entry.path
+        return
 
+    for file in iexpand_path(path):
+        name = os.path.basename(file)
+        if include is not None and not include.match(name):
+            continue
+        if exclude is not None and exclude.match(name):
+            continue
+        if os.path.exists(file):
+            yield file
 
 
 def is_collection(obj):
@@ -0,0 +1,6 @@
+import sys
+
+# test_clint_async uses syntax older Pythons can't even parse
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore.append('test_clint_async.py')
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures the per-line cost of puts() at various indentation depths."""
+
+from __future__ import print_function
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath('..'))
+
+from timeit import timeit
+from clint.textui import puts, indent, dedent
+
+LINES = 100000
+
+
+def _discard(s):
+    pass
+
+
+def bench(depth):
+    for _ in range(depth):
+        indent(2, quote=' >')
+    try:
+        total = timeit(lambda: puts('hello world', stream=_discard),
+                       number=LINES)
+    finally:
+        for _ in range(depth):
+            dedent()
+    return total / LINES
+
+
+if __name__ == '__main__':
+    for depth in (1, 8, 32):
+        print('depth %2i: %.3f usec/line' % (depth, bench(depth) * 1e6))
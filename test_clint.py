@@ -4,6 +4,8 @@
 """Clint Test Suite."""
 
 import os
+import signal
+import sys
 import unittest
 
 
@@ -17,6 +19,174 @@ class ClintTestCase(unittest.TestCase):
     def tearDown(self):
         pass
 
+
+class ArgsTestCase(unittest.TestCase):
+
+    def test_lookups(self):
+        from clint.arguments import Args
+        args = Args(['-v', 'file', '--out', 'x', '-v'], no_argv=True)
+        self.assertEqual(args.first('-v'), 0)
+        self.assertEqual(args.first(['y', 'x']), 3)
+        self.assertEqual(args.value_after('--out'), 'x')
+        self.assertEqual(args.value_after('-v'), 'file')
+        self.assertEqual(args.value_after('y'), None)
+        self.assertEqual(args.start_with(['--', 'f']).all, ['file', '--out'])
+        self.assertEqual(args.first_with('-'), 0)
+        self.assertTrue(args.any_contain('-v'))
+
+    def test_index_follows_changes(self):
+        from clint.arguments import Args
+        args = Args(['a', 'b', 'c', 'd'], no_argv=True)
+        self.assertEqual(args.first('c'), 2)
+        args.remove(['a', 'd'])
+        self.assertEqual(args.all, ['b', 'c'])
+        self.assertEqual(args.first('c'), 1)
+        self.assertEqual(args.pop(0), 'b')
+        self.assertEqual(args.first('c'), 0)
+        args.all.append('e')
+        self.assertEqual(args.first('e'), 1)
+
+    def test_grouped(self):
+        from clint.arguments import Args
+        args = Args(['x', '-v', 'a', '--out=b', 'c', '-qz', 'd'], no_argv=True)
+        grouped = args.grouped
+        self.assertEqual(list(grouped), ['_', '-v', '--out', '-q', '-z'])
+        self.assertEqual(grouped['_'].all, ['x'])
+        self.assertEqual(grouped['-v'].all, ['a'])
+        self.assertEqual(grouped['--out'].all, ['b', 'c'])
+        self.assertEqual(grouped['-z'].all, ['d'])
+        self.assertEqual(args.flags.all, ['-v', '--out=b', '-qz'])
+        self.assertEqual(args.not_flags.all, ['x', 'a', 'c', 'd'])
+
+    def test_views_follow_changes(self):
+        from clint.arguments import Args
+        args = Args(['-v', 'a'], no_argv=True)
+        self.assertEqual(args.flags.all, ['-v'])
+        args.flags.pop(0)
+        args.grouped['-v'].all.append('b')
+        self.assertEqual(args.flags.all, ['-v'])
+        self.assertEqual(args.grouped['-v'].all, ['a'])
+        args.pop(0)
+        self.assertEqual(args.flags.all, [])
+        self.assertEqual(args.grouped['_'].all, ['a'])
+
+    def test_iter_files(self):
+        import shutil
+        import tempfile
+        from clint.arguments import Args
+        top = tempfile.mkdtemp()
+        try:
+            for name in ('a.py', 'b.txt', 'sub/c.py', 'skip/d.py'):
+                path = os.path.join(top, name)
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                open(path, 'w').close()
+            args = Args([top, os.path.join(top, '*.txt'), 'nope'], no_argv=True)
+            expected = sorted(os.path.join(top, name) for name in
+                              ('a.py', 'b.txt', 'sub/c.py', 'skip/d.py', 'b.txt'))
+            self.assertEqual(sorted(args.iter_files()), expected)
+            self.assertEqual(sorted(args.files), expected)
+            self.assertEqual(args.not_files.all, ['nope'])
+            self.assertEqual(
+                sorted(args.iter_files(include='*.py', exclude='skip', workers=2)),
+                [os.path.join(top, 'a.py'), os.path.join(top, 'sub/c.py')])
+        finally:
+            shutil.rmtree(top)
+
+
+    def _schema(self):
+        from clint.arguments import Schema, Option, Positional
+        from clint.textui.validators import IntegerValidator, OptionValidator
+        return Schema(
+            Option('--verbose', '-v', flag=True, repeat=True),
+            Option('--count', '-n', type=IntegerValidator(), default=1),
+            Option('--include', '-I', repeat=True),
+            Option('--mode', validators=[OptionValidator(['fast', 'slow'])]),
+            Positional('src'),
+            Positional('files', nargs='*'),
+        )
+
+    def test_schema_parse(self):
+        from clint.arguments import Args
+        args = self._schema().parse(
+            ['-vvn3', 'a', '--include=x', '-I', 'y', '-Iz', 'b', '--mode', 'slow', '--', '-c'])
+        self.assertEqual(args.verbose, 2)
+        self.assertEqual(args.count, 3)
+        self.assertEqual(args.include, ['x', 'y', 'z'])
+        self.assertEqual(args.mode, 'slow')
+        self.assertEqual(args.src, 'a')
+        self.assertEqual(args.files, ['b', '-c'])
+
+        args = self._schema().parse(Args(['a', '-1'], no_argv=True))
+        self.assertEqual((args.verbose, args.count, args.include, args.mode),
+                         (0, 1, [], None))
+        self.assertEqual(args['files'], ['-1'])
+
+    def test_schema_errors(self):
+        from clint.arguments import ArgumentError
+        schema = self._schema()
+        for argv in (['-n', 'x', 'a'], ['--mode=other', 'a'], [], ['-q', 'a'],
+                     ['a', '--count'], ['--verbose=1', 'a']):
+            self.assertRaises(ArgumentError, schema.parse, argv)
+
+    def test_schema_names(self):
+        from clint.arguments import Schema, Option, Positional
+        schema = Schema(Option('-name'), Option('-n', flag=True))
+        self.assertEqual(schema.parse(['-name', 'a']).name, 'a')
+        self.assertEqual(schema.parse(['-name=b', '-n']).name, 'b')
+        self.assertRaises(ValueError, Schema, Option('--files'),
+                          Positional('files', nargs='*'))
+
+class ExpandPathTestCase(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.top = tempfile.mkdtemp()
+        for name in ('x.py', 'a/y.py', 'a/b/z.py', 'a/b/w.txt', '.h/h.py'):
+            path = os.path.join(self.top, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.top)
+
+    def _expand(self, pattern, **kwargs):
+        from clint.utils import iexpand_path
+        top = os.path.join(self.top, '')
+        return sorted(path[len(top):] for path in
+                      iexpand_path(os.path.join(self.top, pattern), **kwargs))
+
+    def test_globs(self):
+        self.assertEqual(self._expand('*'), ['a', 'x.py'])
+        self.assertEqual(self._expand('*/'), ['a/'])
+        self.assertEqual(self._expand('a/*/*.txt'), ['a/b/w.txt'])
+        self.assertEqual(self._expand('**/*.py'), ['a/b/z.py', 'a/y.py', 'x.py'])
+        self.assertEqual(self._expand('a/**/z.py'), ['a/b/z.py'])
+        self.assertEqual(self._expand('nope/*'), [])
+
+    def test_globs_from_current_directory(self):
+        from clint.utils import expand_path
+        cwd = os.getcwd()
+        os.chdir(self.top)
+        try:
+            self.assertEqual(sorted(expand_path('**')),
+                             ['a', 'a/b', 'a/b/w.txt', 'a/b/z.py', 'a/y.py', 'x.py'])
+            self.assertEqual(sorted(expand_path('**/')), ['a/', 'a/b/'])
+        finally:
+            os.chdir(cwd)
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'needs symlinks')
+    def test_symlink_loops(self):
+        os.symlink('..', os.path.join(self.top, 'a', 'b', 'up'))
+        os.symlink('a', os.path.join(self.top, 'side'))
+        self.assertEqual(self._expand('**/z.py'), ['a/b/z.py'])
+        self.assertEqual(self._expand('**/z.py', follow_symlinks=True),
+                         ['a/b/z.py', 'side/b/z.py'])
+        self.assertEqual(self._expand('a', follow_symlinks=True),
+                         ['a/b/w.txt', 'a/b/z.py', 'a/y.py'])
+
 class ColoredStringTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -62,6 +232,78 @@ class ColoredStringTestCase(unittest.TestCase):
         new_str = u'' + ColoredString('RED', inp_str)
         assert inp_str.encode('utf-8') in new_str
 
+    def test_color_str_is_rendered_once(self):
+        from clint.textui import colored
+        new_str = colored.ColoredString('RED', 'hello', always_color=True)
+        rendered = new_str.color_str
+        self.assertTrue(new_str.color_str is rendered)
+        self.assertTrue('hello' in rendered and rendered != 'hello')
+
+        new_str.color = 'GREEN'
+        new_str.bold = True
+        self.assertEqual(new_str.color_str,
+                         colored.green('hello', always=True, bold=True).color_str)
+        new_str.s = 'bye'
+        self.assertTrue('bye' in new_str.color_str)
+
+    def test_stream_color_detection_is_cached(self):
+        from clint.textui import colored
+
+        class Stream(object):
+            calls = 0
+            def isatty(self):
+                self.calls += 1
+                return True
+
+        stream = Stream()
+        self.assertTrue(colored._stream_supports_color(stream))
+        self.assertTrue(colored._stream_supports_color(stream))
+        self.assertEqual(stream.calls, 1)
+
+        # The cache doesn't keep streams alive
+        import gc
+        import weakref
+        ref = weakref.ref(stream)
+        del stream
+        gc.collect()
+        self.assertTrue(ref() is None)
+
+    def test_clean(self):
+        from clint.textui.colored import ColoredString, clean
+        self.assertEqual(clean(u'h\xe9llo [1m'), u'h\xe9llo [1m')
+        self.assertEqual(clean(ColoredString('RED', 'hi', always_color=True)), 'hi')
+        self.assertEqual(clean('\x1b]0;title\x07a\x1b[1;31mb\x1b(B'), 'ab')
+
+
+def _colors(text):
+    return [(style and style[0], s) for style, s in text.spans]
+
+
+class StyledTextTestCase(unittest.TestCase):
+
+    def test_concat_keeps_spans(self):
+        from clint.textui.colored import ColoredString, StyledText
+        text = ColoredString('RED', 'error') + StyledText(': bad')
+        self.assertEqual(_colors(text), [('RED', 'error'), (None, ': bad')])
+        self.assertEqual(len(text), 10)
+        self.assertEqual(text.plain, 'error: bad')
+
+    def test_slice_and_split(self):
+        from clint.textui.colored import ColoredString, StyledText
+        text = StyledText(ColoredString('RED', 'ab cd'), ' ef')
+        self.assertEqual(_colors(text[1:4]), [('RED', 'b c')])
+        self.assertEqual([w.plain for w in text.split()], ['ab', 'cd', 'ef'])
+        self.assertEqual(_colors(text.split()[1]), [('RED', 'cd')])
+
+    def test_max_width(self):
+        from clint.textui.colored import ColoredString, StyledText
+        from clint.textui.formatters import max_width, min_width
+        text = StyledText(ColoredString('RED', 'aaa bbb'), ' ccc')
+        wrapped = max_width(text, 7)
+        self.assertEqual(wrapped.plain, 'aaa bbb\nccc')
+        self.assertEqual(wrapped.splitlines()[1].spans, [(None, 'ccc')])
+        self.assertEqual(min_width(StyledText('ab\nc'), 3), 'ab \nc  ')
+
 
 class TextuiFormatterTestCase(unittest.TestCase):
 
@@ -87,6 +329,357 @@ class TextuiFormatterTestCase(unittest.TestCase):
         rows = max_width(c_text, 7).split('\n')
         _test_n_rows_width(self, rows, 2, 7)
 
+    def test_display_width(self):
+        from clint.textui import display_width, colored
+        from clint.textui.formatters import max_width, min_width
+        self.assertEqual(display_width(u'\u65e5\u672c'), 4)
+        self.assertEqual(display_width(u'e\u0301'), 1)
+        self.assertEqual(display_width(colored.red('abc', always=True)), 3)
+        self.assertEqual(min_width(u'\u65e5\u672c', 6), u'\u65e5\u672c  ')
+        self.assertEqual(display_width('a\tb'), 3)
+        self.assertEqual(len(colored.red('ab\tc')), 4)
+        self.assertEqual(min_width('a\tb', 5), 'a\tb  ')
+        self.assertEqual(max_width(u'\u65e5\u672c\u8a9e', 4),
+                         u'\u65e5\u672c\n\u8a9e')
+
+    def test_wrap_lines(self):
+        from clint.textui.formatters import wrap_lines
+        lines = iter(['aaa bbb ccc\n', '\n', 'abcdefghij'])
+        rows = wrap_lines(lines, 7)
+        self.assertEqual(next(rows), 'aaa bbb')
+        self.assertEqual(list(rows), ['ccc', '', 'abcdefg', 'hij'])
+
+
+class TextuiBufferedTestCase(unittest.TestCase):
+
+    def test_buffered_preserves_order(self):
+        from clint.textui.core import puts, puts_err, buffered, flush
+        written = []
+        out = lambda s: written.append(('out', s))
+        err = lambda s: written.append(('err', s))
+        with buffered():
+            puts('a', stream=out)
+            puts('b', stream=out)
+            puts_err('c', stream=err)
+            puts('d', stream=out)
+            self.assertEqual(written, [])
+            flush()
+            self.assertEqual(written,
+                [('out', 'a\nb\n'), ('err', 'c\n'), ('out', 'd\n')])
+            puts('e', stream=out)
+        self.assertEqual(written[-1], ('out', 'e\n'))
+
+    def test_buffered_high_water(self):
+        from clint.textui.core import puts, buffered
+        written = []
+        with buffered(high_water=4):
+            puts('ab', stream=written.append)
+            self.assertEqual(written, [])
+            puts('cd', stream=written.append)
+            self.assertEqual(written, ['ab\ncd\n'])
+
+
+class TextuiIndentTestCase(unittest.TestCase):
+
+    def test_indent_stack_prefix(self):
+        from clint.textui.context import IndentStack
+        stack = IndentStack(['  ', ' > '])
+        self.assertEqual(stack.prefix, '   > ')
+        self.assertEqual(stack.pop(), ' > ')
+        self.assertEqual(stack.prefix, '  ')
+        self.assertEqual(list(stack), ['  '])
+
+    def test_nested_indent(self):
+        from clint.textui.core import puts, indent
+        written = []
+        with indent(2):
+            with indent(3, quote='>'):
+                puts('a\nb', stream=written.append)
+            puts('c', stream=written.append)
+        self.assertEqual(written, ['  >  a\n  >  b\n', '  c\n'])
+
+
+    def test_indent_is_thread_local(self):
+        import threading
+        from clint.textui.core import puts, indent
+        written = []
+
+        def worker():
+            puts('b', stream=written.append)
+
+        with indent(4):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            puts('a', stream=written.append)
+        self.assertEqual(sorted(written), ['    a\n', 'b\n'])
+
+
+class TerminalSizeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        from clint.textui import cols
+        self.environ = os.environ.copy()
+        cols._install_sigwinch()
+        self.size, cols._TERMINAL_SIZE = cols._TERMINAL_SIZE, (100, 40, None)
+
+    def tearDown(self):
+        from clint.textui import cols
+        os.environ.clear()
+        os.environ.update(self.environ)
+        cols._TERMINAL_SIZE = self.size
+
+    def test_cached_size(self):
+        from clint.textui import cols
+        os.environ.pop('COLUMNS', None)
+        os.environ.pop('LINES', None)
+        self.assertEqual(cols.terminal_size(), (100, 40))
+        self.assertEqual(cols.console_width({}), 100)
+        self.assertEqual(cols.console_width({'width': 20}), 20)
+
+    def test_env_overrides(self):
+        from clint.textui import cols
+        os.environ['COLUMNS'] = '120'
+        os.environ['LINES'] = 'x'
+        self.assertEqual(cols.terminal_size(), (120, 40))
+
+    @unittest.skipUnless(hasattr(signal, 'SIGWINCH'), 'needs SIGWINCH')
+    def test_replaced_handler(self):
+        from clint.textui import cols
+        previous = signal.signal(signal.SIGWINCH, signal.SIG_DFL)
+        try:
+            cols.terminal_size()
+            self.assertNotEqual(cols._TERMINAL_SIZE[2], None)
+        finally:
+            signal.signal(signal.SIGWINCH, previous)
+
+    def test_expired_size_is_queried(self):
+        from clint.textui import cols
+        cols._TERMINAL_SIZE = (100, 40, 0)
+        cols.terminal_size()
+        self.assertNotEqual(cols._TERMINAL_SIZE[2], 0)
+
+
+
+
+class ColumnsTestCase(unittest.TestCase):
+
+    def test_first_column_flexible(self):
+        from clint.textui import columns
+        cols = [['aaa bbb', None], ['cc', 4]]
+        self.assertEqual(columns(*cols, width=15), 'aaa bbb  cc   ')
+        self.assertEqual(cols, [['aaa bbb', None], ['cc', 4]])
+
+    def test_flexible_columns_share_room(self):
+        from clint.textui import columns
+        out = columns(['a', None, {'weight': 2}], ['b', None],
+                      ['c', None, {'max': 3, 'align': 'right'}],
+                      ['d', 3, {'align': 'center'}], width=24)
+        self.assertEqual(out, 'a'.ljust(9) + ' ' + 'b'.ljust(4) + ' ' +
+                         '  c' + ' ' + ' d ' + ' ')
+
+    def test_unknown_alignment(self):
+        from clint.textui import columns
+        self.assertRaises(ValueError, columns, ['a', 3, {'align': 'up'}])
+
+class TableTestCase(unittest.TestCase):
+
+    def test_table_aligns_and_wraps(self):
+        from clint.textui import table
+        rows = [('a', 'bb'), ('ccc', 'dd ee ff'), (1, None)]
+        self.assertEqual(list(table(rows, width=10)), [
+            'a   bb    ',
+            'ccc dd ee ',
+            '    ff    ',
+            '1   None  ',
+        ])
+
+    def test_table_sample(self):
+        from clint.textui import table
+        rows = [('a', 'b'), ('ccc', 'd'), ('e', )]
+        # only the first row is measured, wider cells get wrapped
+        self.assertEqual(list(table(iter(rows), sample=1, width=80)), [
+            'a b', 'c d', 'c  ', 'c  ', 'e  '])
+        self.assertEqual(list(table(iter(rows), sample=None, width=80)), [
+            'a   b', 'ccc d', 'e    '])
+        self.assertEqual(list(table([], width=80)), [])
+        self.assertRaises(ValueError, list, table(iter(rows), sample=0))
+
+
+class PipesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stdin = sys.stdin
+
+    def tearDown(self):
+        sys.stdin = self.stdin
+
+    def test_piped_lines_and_chunks(self):
+        import io
+        from clint import pipes
+        sys.stdin = io.StringIO(u'one\ntwo\r\nthree')
+        self.assertEqual(list(pipes.piped_lines()), ['one', 'two', 'three'])
+        sys.stdin = io.StringIO(u'abcde')
+        self.assertEqual(list(pipes.piped_chunks(2)), ['ab', 'cd', 'e'])
+
+    def test_piped_bytes_from_file(self):
+        import io
+        import tempfile
+        from clint import pipes
+        with tempfile.TemporaryFile() as f:
+            f.write(b'0123456789')
+            f.flush()
+            raw = io.FileIO(f.fileno(), closefd=False)
+            sys.stdin = io.TextIOWrapper(io.BufferedReader(raw))
+            for use_mmap in (True, False):
+                sys.stdin.buffer.seek(3)
+                self.assertEqual(list(pipes.piped_bytes(4, use_mmap=use_mmap)),
+                                 [b'3456', b'789'])
+
+class ProgressTestCase(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            from StringIO import StringIO  # takes native str on Python 2
+        except ImportError:
+            from io import StringIO
+        from clint.textui import progress
+        self.stream = StringIO()
+        self._stream, progress.STREAM = progress.STREAM, self.stream
+
+    def tearDown(self):
+        from clint.textui import progress
+        progress.STREAM = self._stream
+
+    def test_bar_max_refresh(self):
+        from clint.textui import progress
+        items = list(progress.bar(range(1000), hide=False, max_refresh=1))
+        self.assertEqual(len(items), 1000)
+        redraws = self.stream.getvalue().split('\r')
+        # initial, first update, final state and done()
+        self.assertTrue(len(redraws) <= 5)
+        self.assertTrue(' 1000/1000 ' in redraws[-2])
+
+    def test_threaded_bar(self):
+        from clint.textui import progress
+        with progress.Bar(expected_size=10, hide=False, threaded=True) as bar:
+            renderer = bar.renderer
+            for i in range(10):
+                bar.show(i + 1)
+        self.assertFalse(renderer.is_alive())
+        self.assertEqual(bar.renderer, None)
+        self.assertTrue(self.stream.getvalue().endswith(' 10/10 - 00:00:00\r\n'))
+
+    def test_multibar_redraws_changed_lines(self):
+        from clint.textui import progress
+        self.stream.isatty = lambda: True
+        with progress.MultiBar(width=4) as bars:
+            a = bars.add('a ', 2)
+            b = bars.add('b ', 2)
+            bars.next_redraw = 0
+            bars.update(b, 1)
+        output = self.stream.getvalue()
+        self.assertTrue(output.startswith('a [    ] 0/2 - 00:00:00\n'
+                                          'b [    ] 0/2 - 00:00:00\n'))
+        self.assertTrue('\x1b[1A\rb [##  ] 1/2' in output)
+        self.assertFalse('\x1b[2A' in output.split('\x1b[1A')[0])
+
+    def test_multibar_summary_without_tty(self):
+        from clint.textui import progress
+        with progress.MultiBar() as bars:
+            a = bars.add('a ', 2)
+            b = bars.add('b ', 3)
+            bars.update(a, 2)
+        self.assertEqual(self.stream.getvalue().splitlines()[-1],
+                         'a 2/2, b 0/3')
+
+    def test_estimators(self):
+        from clint.textui import progress
+        sma = progress.SMAEstimator(interval=0)
+        sma.start = sma.last = 0
+        self.assertTrue(sma.update(9, 10))
+        self.assertEqual(sma.rate, 1.0)
+        self.assertEqual(sma.eta(5), 5)
+
+        ewma = progress.EWMAEstimator(alpha=0.5, interval=0)
+        ewma.last = 0
+        ewma.update(10, 1)
+        ewma.update(30, 2)
+        self.assertEqual(ewma.rate, 15)
+
+        window = progress.WindowEstimator(window=2, interval=0)
+        window.samples.append((0, 0))
+        for now, done in ((1, 100), (2, 110), (3, 120)):
+            window.update(done, now)
+        self.assertEqual(window.rate, 10)
+        self.assertEqual(window.eta(20), 2)
+
+    def test_bar_rate(self):
+        from clint.textui import progress
+        bar = progress.Bar(expected_size=10, hide=True, unit='B')
+        bar.estimator.samples.append(0.001)
+        bar.estimator.total = 0.001
+        self.assertTrue(bar.render(5).endswith(' - 1000 B/s\r'))
+        self.assertEqual(progress.format_size(3 * 1024 ** 2), '3.0 MB')
+
+    def test_progress_file(self):
+        import io
+        import shutil
+        from clint.textui import progress
+        src, dst = io.BytesIO(b'x' * 3000), io.BytesIO()
+        with progress.ProgressFile(src, expected_size=3000, hide=False) as f:
+            shutil.copyfileobj(f, dst, 1024)
+            self.assertEqual(f.transferred, 3000)
+            self.assertEqual(f.readinto(bytearray(10)), 0)
+        self.assertEqual(dst.getvalue(), src.getvalue())
+        self.assertTrue(' 2.9 KB/2.9 KB - ' in self.stream.getvalue())
+
+        dst.seek(0)
+        f = progress.ProgressFile(dst, expected_size=10, hide=True)
+        buf = bytearray(10)
+        self.assertEqual(f.readinto(buf), 10)
+        self.assertEqual(f.transferred, 10)
+
+    def test_bar_unknown_length(self):
+        from clint.textui import progress
+        items = list(progress.bar((i for i in range(5)), hide=False))
+        self.assertEqual(items, list(range(5)))
+        output = self.stream.getvalue().split('\r')
+        self.assertTrue(output[-2].startswith('5 - 00:00:00 - '))
+        self.assertTrue(output[-2].endswith(' it/s'))
+
+    def test_bar_length_hint(self):
+        from clint.textui import progress
+        list(progress.bar(iter(range(5)), hide=False))
+        output = self.stream.getvalue()
+        self.assertTrue(' 0/5 ' in output)
+        self.assertTrue(' 5/5 ' in output)
+
+    def test_mill_unknown_length(self):
+        from clint.textui import progress
+        list(progress.mill((i for i in range(3)), hide=False))
+        self.assertEqual(self.stream.getvalue().split('\r')[-2], '   3/3')
+
+    def test_auto_width_bar(self):
+        from clint.textui import cols, progress
+        size = cols._TERMINAL_SIZE
+        try:
+            cols._install_sigwinch()
+            cols._TERMINAL_SIZE = (60, 24, None)
+            bar = progress.Bar(label='x ', width='auto', expected_size=10, hide=True)
+            self.assertEqual(len(bar.render(5)), 60)  # 59 columns and '\r'
+            cols._on_sigwinch(None, None)
+            self.assertEqual(cols._TERMINAL_SIZE, None)
+        finally:
+            cols._TERMINAL_SIZE = size
+
+    def test_mill_max_refresh(self):
+        from clint.textui import progress
+        list(progress.mill(range(1000), hide=False, max_refresh=1))
+        redraws = self.stream.getvalue().split('\r')
+        self.assertTrue(len(redraws) <= 4)
+        self.assertTrue('1000/1000' in redraws[-2])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Tests of the asyncio helpers, kept apart from test_clint as they need
+# Python 3.6+ syntax (see conftest.py).
+
+import asyncio
+import sys
+import time
+import unittest
+from io import StringIO
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'requires asyncio.run')
+class AsyncProgressTestCase(unittest.TestCase):
+
+    def setUp(self):
+        from clint.textui import progress
+        self.stream = StringIO()
+        self._stream, progress.STREAM = progress.STREAM, self.stream
+
+    def tearDown(self):
+        from clint.textui import progress
+        progress.STREAM = self._stream
+
+    def test_async_iterators(self):
+        from clint.textui import progress
+
+        async def numbers(n):
+            for i in range(n):
+                await asyncio.sleep(0)
+                yield i
+
+        async def consume():
+            items = [i async for i in progress.abar(numbers(3), hide=False)]
+            items += [i async for i in progress.adots(numbers(4), label='x', every=2)]
+            items += [i async for i in progress.amill(numbers(2))]
+            return items
+
+        self.assertEqual(asyncio.run(consume()), [0, 1, 2, 0, 1, 2, 3, 0, 1])
+        output = self.stream.getvalue()
+        self.assertTrue('3 - 00:00:00 - ' in output)
+        self.assertTrue('x..\n' in output)
+        self.assertTrue(output.endswith('   2/2\r\n'))
+
+    def test_async_as_completed(self):
+        from clint.textui import progress
+
+        async def run():
+            tasks = [asyncio.ensure_future(asyncio.sleep(0, i)) for i in range(3)]
+            return sorted([await f for f in progress.as_completed(tasks, hide=False)])
+
+        self.assertEqual(asyncio.run(run()), [0, 1, 2])
+        self.assertTrue(' 3/3 - ' in self.stream.getvalue())
+
+    def test_async_as_completed_break(self):
+        import threading
+        from clint.textui import progress
+
+        async def run():
+            tasks = [asyncio.ensure_future(asyncio.sleep(0, i)) for i in range(3)]
+            for f in progress.as_completed(tasks, hide=False):
+                await f
+                break
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        # The bar is finished in the executor, which asyncio.run() only
+        # waits for from Python 3.9 on
+        deadline = time.time() + 5
+        while (not self.stream.getvalue().endswith('\n') and
+               time.time() < deadline):
+            time.sleep(0.01)
+        self.assertTrue(self.stream.getvalue().endswith('\n'))
+        self.assertFalse([t for t in threading.enumerate()
+                          if isinstance(t, progress._Renderer)])
+
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'requires asyncio.run')
+class AsyncBufferedTestCase(unittest.TestCase):
+
+    def test_task_outliving_buffered_block(self):
+        from clint.textui import core
+
+        lines = []
+
+        async def late():
+            await asyncio.sleep(0.01)
+            core.puts('late', stream=lines.append)
+
+        async def run():
+            with core.buffered():
+                core.puts('early', stream=lines.append)
+                task = asyncio.ensure_future(late())
+            await task
+
+        asyncio.run(run())
+        self.assertEqual(lines, ['early\n', 'late\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()